@@ -0,0 +1,50 @@
+"""Stat-keyed .env parsing shared by the service manager and port configurator."""
+
+import re
+from pathlib import Path
+
+# One KEY=value assignment per line. Comment lines are skipped; the key is the
+# text before the first "=" and the value everything after it. Both groups are
+# greedy so the scan never backtracks; surrounding whitespace is trimmed after.
+_ENV_LINE_RE = re.compile(r"^[^\S\n]*([^\s#=][^=\n]*)?=(.*)$", re.M)
+
+# Parsed files keyed by path, valid while the (st_mtime_ns, st_size) matches.
+_env_cache: dict[Path, tuple[tuple[int, int], dict[str, str]]] = {}
+
+
+def parse_env(content: str) -> dict[str, str]:
+    return {
+        key.rstrip(): value.strip().strip('"').strip("'")
+        for key, value in _ENV_LINE_RE.findall(content)
+    }
+
+
+def read_env_vars(path: Path) -> dict[str, str]:
+    """Return the variables in ``path``, or an empty dict if it cannot be read.
+
+    The returned dict is shared between callers and must not be mutated.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return {}
+    stat_key = (st.st_mtime_ns, st.st_size)
+    cached = _env_cache.get(path)
+    if cached is not None and cached[0] == stat_key:
+        return cached[1]
+
+    try:
+        content = path.read_bytes().decode("utf-8", errors="replace")
+    except OSError:
+        return {}
+    env_vars = parse_env(content)
+
+    _env_cache[path] = (stat_key, env_vars)
+    return env_vars
+
+
+def invalidate_env(path: Path):
+    _env_cache.pop(path, None)
+
+
+__all__ = ["parse_env", "read_env_vars", "invalidate_env"]
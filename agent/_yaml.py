@@ -0,0 +1,15 @@
+"""PyYAML loader/dumper selection, preferring the libyaml C bindings."""
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+
+    HAS_LIBYAML = True
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
+    # Reported from ServiceAgent.startup: this module is imported before
+    # logging is configured, so a message here would be dropped.
+    HAS_LIBYAML = False
+
+__all__ = ["HAS_LIBYAML", "SafeDumper", "SafeLoader"]
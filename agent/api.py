@@ -1,17 +1,27 @@
+import asyncio
 import logging
+import time
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
 
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 
 if TYPE_CHECKING:
+    from agent.capability_generator import CapabilityGenerator
     from agent.service_manager import ServiceManager
     from agent.discovery import ServiceDiscovery
     from agent.resource_monitor import ResourceMonitor
 
 logger = logging.getLogger("agent.api")
 
+RESPONSE_CACHE_TTL_SECONDS = 2.0
+STOPPED_STATUS_VALUES = frozenset({"stopped", "ready"})
+AGENT_VERSION = "1.0.0"
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
 
 class StartServiceRequest(BaseModel):
     port_assignments: Optional[dict[str, int]] = None
@@ -24,12 +34,115 @@ class ConfigUpdateRequest(BaseModel):
     always_running: Optional[list[str]] = None
 
 
+class GenerateCapabilitiesRequest(BaseModel):
+    service_ids: Optional[list[str]] = None
+    force: bool = False
+
+
+def format_sse(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+async def read_body(request: Request, model: type[BaseModel]) -> BaseModel:
+    """Parse the JSON body with orjson and validate it against ``model``.
+
+    An empty body yields the model defaults. Handlers take the raw request, so
+    routes that use this declare their schema with ``json_body(model)``.
+    """
+    raw = await request.body()
+    if not raw:
+        return model.model_construct()
+
+    try:
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Request body must be an object")
+
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422, detail=e.errors(include_url=False, include_context=False)
+        )
+
+
+def json_body(model: type[BaseModel]) -> dict:
+    """OpenAPI ``requestBody`` for a route that reads its body via read_body."""
+    return {
+        "requestBody": {
+            "content": {"application/json": {"schema": model.model_json_schema()}}
+        }
+    }
+
+
+class ResponseCache:
+    """Short-lived cache of rendered JSON bodies for polled read endpoints.
+
+    Entries expire after ``ttl`` seconds or as soon as the discovery state
+    version changes, whichever comes first.
+    """
+
+    def __init__(self, discovery, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.discovery = discovery
+        self.ttl = ttl
+        self._entries: dict[str, tuple[int, float, bytes]] = {}
+
+    def get(self, key: str) -> Optional[Response]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        version, stored_at, body = entry
+        expired = time.monotonic() - stored_at > self.ttl
+        if expired or version != self.discovery.version:
+            del self._entries[key]
+            return None
+
+        return Response(content=body, media_type="application/json")
+
+    def store(self, key: str, response: Response) -> Response:
+        self._entries[key] = (self.discovery.version, time.monotonic(), response.body)
+        return response
+
+    def clear(self):
+        self._entries.clear()
+
+
 def create_api_router(agent) -> APIRouter:
-    router = APIRouter()
+    router = APIRouter(default_response_class=ORJSONResponse)
+    response_cache = ResponseCache(agent.discovery)
 
-    @router.get("/discover")
-    async def discover(request: Request):
+    identity_cache: dict[tuple[str, str], tuple[bytes, bytes]] = {}
+
+    def identity_fragments() -> tuple[bytes, bytes]:
+        """Serialized agent identity: the /discover agent block and /status prefix."""
         config = agent.config
+        key = (config.machine_id, config.machine_name)
+        fragments = identity_cache.get(key)
+        if fragments is None:
+            discover_agent = orjson.dumps(
+                {
+                    "machine_id": config.machine_id,
+                    "machine_name": config.machine_name,
+                    "version": AGENT_VERSION,
+                    "uptime_seconds": None,
+                }
+            )
+            status_prefix = orjson.dumps(
+                {
+                    "status": "healthy",
+                    "machine_id": config.machine_id,
+                    "machine_name": config.machine_name,
+                }
+            )[:-1]
+            identity_cache.clear()
+            fragments = identity_cache[key] = (discover_agent, status_prefix)
+        return fragments
+
+    def render_discover() -> bytes:
         discovery = agent.discovery
         resource_monitor = agent.resource_monitor
         service_manager = agent.service_manager
@@ -40,101 +153,105 @@ def create_api_router(agent) -> APIRouter:
 
             if service.capability:
                 configured_ports = service_manager._get_configured_ports(service)
-                api_port_config = service.capability.ports.get("api")
-                ui_port_config = service.capability.ports.get("ui")
-
-                service_dict["capability"] = {
-                    "runtime": {
-                        "start_command": service.capability.start_command,
-                        "working_directory": service.capability.working_directory,
-                        "ports": {
-                            key: {
-                                "default": pc.default,
-                                "configured": configured_ports.get(key, pc.default),
-                                "env_var": pc.env_var,
-                                "cli_arg": pc.cli_arg,
-                            }
-                            for key, pc in service.capability.ports.items()
-                        },
-                    },
-                    "endpoints": {
-                        "api": {
-                            "port": configured_ports.get(
-                                "api",
-                                api_port_config.default if api_port_config else 8000,
-                            ),
-                            "port_key": "api",
-                            "health_check": service.capability.health_check_path,
-                            "base_path": service.capability.api_base_path,
-                            "docs": "/docs",
-                        },
-                        **(
-                            {
-                                "ui": {
-                                    "port": configured_ports.get(
-                                        "ui",
-                                        ui_port_config.default
-                                        if ui_port_config
-                                        else None,
-                                    ),
-                                    "port_key": "ui",
-                                    "path": "/",
-                                }
-                            }
-                            if ui_port_config
-                            else {}
-                        ),
-                    },
-                    "operations": service.capability.operations,
-                    "inputs": service.capability.inputs
-                    if hasattr(service.capability, "inputs")
-                    else [],
-                    "outputs": service.capability.outputs
-                    if hasattr(service.capability, "outputs")
-                    else [],
-                }
+                service_dict["capability"] = service.get_discover_capability(
+                    configured_ports
+                )
 
             services_data.append(service_dict)
 
-        return {
-            "agent": {
-                "machine_id": config.machine_id,
-                "machine_name": config.machine_name,
-                "version": "1.0.0",
-                "uptime_seconds": None,
-            },
-            "services": services_data,
-            "resources": resource_monitor.get_all_stats(),
-        }
-
-    @router.get("/status")
-    async def status(request: Request):
-        config = agent.config
+        discover_agent, _ = identity_fragments()
+        return (
+            b'{"agent":'
+            + discover_agent
+            + b',"services":'
+            + orjson.dumps(services_data, option=JSON_OPTIONS)
+            + b',"resources":'
+            + orjson.dumps(resource_monitor.latest_stats(), option=JSON_OPTIONS)
+            + b"}"
+        )
+
+    def render_status() -> bytes:
         discovery = agent.discovery
         resource_monitor = agent.resource_monitor
 
         services = discovery.get_all_services()
 
-        return {
-            "status": "healthy",
-            "machine_id": config.machine_id,
-            "machine_name": config.machine_name,
-            "services": {
-                "total": len(services),
-                "running": sum(1 for s in services if s.is_running),
-                "stopped": sum(
-                    1 for s in services if s.status.value in ["stopped", "ready"]
-                ),
-                "failed": sum(1 for s in services if s.status.value == "failed"),
-            },
-            "resources": resource_monitor.get_all_stats(),
+        running = stopped = failed = 0
+        for s in services:
+            value = s.status.value
+            if value == "running":
+                running += 1
+            elif value in STOPPED_STATUS_VALUES:
+                stopped += 1
+            elif value == "failed":
+                failed += 1
+
+        _, status_prefix = identity_fragments()
+        counts = {
+            "total": len(services),
+            "running": running,
+            "stopped": stopped,
+            "failed": failed,
         }
+        return (
+            status_prefix
+            + b',"services":'
+            + orjson.dumps(counts)
+            + b',"resources":'
+            + orjson.dumps(resource_monitor.latest_stats(), option=JSON_OPTIONS)
+            + b"}"
+        )
+
+    @router.get("/discover")
+    async def discover(request: Request):
+        cached = response_cache.get("discover")
+        if cached is not None:
+            return cached
+
+        return response_cache.store(
+            "discover", Response(render_discover(), media_type="application/json")
+        )
+
+    @router.get("/status")
+    async def status(request: Request):
+        return Response(render_status(), media_type="application/json")
+
+    @router.get("/events")
+    async def events(request: Request):
+        """Stream discover snapshots on state changes and periodic status."""
+        discovery = agent.discovery
+        interval = agent.config.resources.monitor_interval_seconds
+
+        async def event_stream():
+            changes = discovery.subscribe()
+            try:
+                yield format_sse("discover", render_discover())
+                while not await request.is_disconnected():
+                    try:
+                        await asyncio.wait_for(changes.get(), timeout=interval)
+                    except asyncio.TimeoutError:
+                        yield format_sse("status", render_status())
+                    else:
+                        yield format_sse("discover", render_discover())
+            finally:
+                discovery.unsubscribe(changes)
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
 
     @router.get("/services")
     async def list_services(request: Request):
+        cached = response_cache.get("services")
+        if cached is not None:
+            return cached
+
         discovery = agent.discovery
 
-        return {"services": [s.to_dict() for s in discovery.get_all_services()]}
+        return response_cache.store(
+            "services",
+            ORJSONResponse(
+                {"services": [s.to_dict() for s in discovery.get_all_services()]}
+            ),
+        )
 
     @router.get("/services/{service_id}")
     async def get_service(service_id: str, request: Request):
@@ -152,24 +269,27 @@ def create_api_router(agent) -> APIRouter:
 
         return result
 
-    @router.post("/services/{service_id}/start")
-    async def start_service(
-        service_id: str, body: StartServiceRequest, request: Request
-    ):
+    @router.post(
+        "/services/{service_id}/start", openapi_extra=json_body(StartServiceRequest)
+    )
+    async def start_service(service_id: str, request: Request):
         service_manager = agent.service_manager
+        body = await read_body(request, StartServiceRequest)
 
         try:
             service = await service_manager.start_service(
                 service_id, port_assignments=body.port_assignments
             )
-            return {
-                "success": True,
-                "service_id": service_id,
-                "status": service.status.value,
-                "pid": service.pid,
-                "assigned_ports": service.assigned_ports,
-                "message": f"Service started on ports {service.assigned_ports}",
-            }
+            return ORJSONResponse(
+                {
+                    "success": True,
+                    "service_id": service_id,
+                    "status": service.status.value,
+                    "pid": service.pid,
+                    "assigned_ports": service.assigned_ports,
+                    "message": f"Service started on ports {service.assigned_ports}",
+                }
+            )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
@@ -182,36 +302,41 @@ def create_api_router(agent) -> APIRouter:
 
         try:
             service = await service_manager.stop_service(service_id)
-            return {
-                "success": True,
-                "service_id": service_id,
-                "status": service.status.value,
-                "message": "Service stopped successfully",
-            }
+            return ORJSONResponse(
+                {
+                    "success": True,
+                    "service_id": service_id,
+                    "status": service.status.value,
+                    "message": "Service stopped successfully",
+                }
+            )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.exception(f"Failed to stop service {service_id}")
             raise HTTPException(status_code=500, detail=str(e))
 
-    @router.post("/services/{service_id}/restart")
-    async def restart_service(
-        service_id: str, body: StartServiceRequest, request: Request
-    ):
+    @router.post(
+        "/services/{service_id}/restart", openapi_extra=json_body(StartServiceRequest)
+    )
+    async def restart_service(service_id: str, request: Request):
         service_manager = agent.service_manager
+        body = await read_body(request, StartServiceRequest)
 
         try:
             service = await service_manager.restart_service(
                 service_id, port_assignments=body.port_assignments
             )
-            return {
-                "success": True,
-                "service_id": service_id,
-                "status": service.status.value,
-                "pid": service.pid,
-                "assigned_ports": service.assigned_ports,
-                "message": "Service restarted successfully",
-            }
+            return ORJSONResponse(
+                {
+                    "success": True,
+                    "service_id": service_id,
+                    "status": service.status.value,
+                    "pid": service.pid,
+                    "assigned_ports": service.assigned_ports,
+                    "message": "Service restarted successfully",
+                }
+            )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
@@ -237,17 +362,18 @@ def create_api_router(agent) -> APIRouter:
                 status_code=404, detail=f"Service not found: {service_id}"
             )
 
-        return {
-            "service_id": service_id,
-            "logs": service_manager.get_service_logs(service_id, lines=lines),
-        }
+        logs = service_manager.get_service_logs(service_id, lines=lines)
+        return ORJSONResponse(
+            {
+                "service_id": service_id,
+                "logs": logs,
+            }
+        )
 
     @router.post("/services/{service_id}/refresh-capability")
     async def refresh_capability(service_id: str, request: Request):
-        from agent.capability_generator import CapabilityGenerator
-
         discovery = agent.discovery
-        config = agent.config
+        generator = agent.capability_generator
 
         service = discovery.get_service(service_id)
         if not service:
@@ -256,11 +382,12 @@ def create_api_router(agent) -> APIRouter:
             )
 
         try:
-            generator = CapabilityGenerator(config)
-            capability_yaml = await generator.generate_capability(service.path)
+            capability_yaml, data = await generator.generate_capability(
+                service.path, force=True
+            )
 
-            updated_service = discovery.update_service_capability(
-                service_id, capability_yaml
+            updated_service = await asyncio.to_thread(
+                discovery.update_service_capability, service_id, capability_yaml, data
             )
 
             return {
@@ -275,27 +402,90 @@ def create_api_router(agent) -> APIRouter:
             logger.exception(f"Failed to refresh capability for {service_id}")
             raise HTTPException(status_code=500, detail=str(e))
 
+    @router.post(
+        "/services/generate-capabilities",
+        openapi_extra=json_body(GenerateCapabilitiesRequest),
+    )
+    async def generate_capabilities(request: Request):
+        """Generate capabilities for several services, batching LLM calls.
+
+        Without ``service_ids`` every discovered service lacking a capability is
+        generated. ``force`` regenerates instead of reusing cached results.
+        """
+        discovery = agent.discovery
+        generator = agent.capability_generator
+        body = await read_body(request, GenerateCapabilitiesRequest)
+
+        if body.service_ids is None:
+            services = [s for s in discovery.get_all_services() if not s.capability]
+        else:
+            services = []
+            for service_id in body.service_ids:
+                service = discovery.get_service(service_id)
+                if not service:
+                    raise HTTPException(
+                        status_code=404, detail=f"Service not found: {service_id}"
+                    )
+                services.append(service)
+
+        try:
+            generated = await generator.generate_capabilities_batch(
+                [service.path for service in services], force=body.force
+            )
+
+            updated = []
+            failed = []
+            for service in services:
+                result = generated.get(service.path)
+                if result is None:
+                    failed.append(service.id)
+                    continue
+                await asyncio.to_thread(
+                    discovery.update_service_capability, service.id, *result
+                )
+                updated.append(service.id)
+
+            return ORJSONResponse(
+                {
+                    "success": not failed,
+                    "generated": updated,
+                    "failed": failed,
+                }
+            )
+        except Exception as e:
+            logger.exception("Failed to generate capabilities")
+            raise HTTPException(status_code=500, detail=str(e))
+
     @router.get("/resources")
     async def get_resources(request: Request):
+        cached = response_cache.get("resources")
+        if cached is not None:
+            return cached
+
         resource_monitor = agent.resource_monitor
-        return resource_monitor.get_all_stats()
+        return response_cache.store(
+            "resources", ORJSONResponse(resource_monitor.latest_stats())
+        )
 
     @router.get("/config")
     async def get_config(request: Request):
         config = agent.config
 
-        return {
-            "machine_id": config.machine_id,
-            "machine_name": config.machine_name,
-            "machine_description": config.machine_description,
-            "service_folders": config.service_folders,
-            "always_running": config.always_running,
-            "agent_port": config.agent.port,
-        }
+        return ORJSONResponse(
+            {
+                "machine_id": config.machine_id,
+                "machine_name": config.machine_name,
+                "machine_description": config.machine_description,
+                "service_folders": config.service_folders,
+                "always_running": config.always_running,
+                "agent_port": config.agent.port,
+            }
+        )
 
-    @router.put("/config")
-    async def update_config(body: ConfigUpdateRequest, request: Request):
+    @router.put("/config", openapi_extra=json_body(ConfigUpdateRequest))
+    async def update_config(request: Request):
         config = agent.config
+        body = await read_body(request, ConfigUpdateRequest)
 
         if body.machine_name is not None:
             config.machine_name = body.machine_name
@@ -304,6 +494,9 @@ def create_api_router(agent) -> APIRouter:
         if body.always_running is not None:
             config.always_running = body.always_running
 
+        config.mark_changed()
+        response_cache.clear()
+
         return {
             "success": True,
             "message": "Configuration updated",
@@ -330,11 +523,10 @@ def create_api_router(agent) -> APIRouter:
 
         try:
             discovery.add_service_folder(folder_path)
-            services = discovery.scan()
             return {
                 "success": True,
                 "folder": folder_path,
-                "services_found": len(services),
+                "services_found": len(discovery.get_all_services()),
             }
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
@@ -343,15 +535,19 @@ def create_api_router(agent) -> APIRouter:
     async def get_port_conflicts(request: Request):
         """Get services with conflicting default ports."""
         service_manager = agent.service_manager
-        conflicts = service_manager.get_port_conflicts()
+        conflicts = await asyncio.to_thread(service_manager.get_port_conflicts)
 
-        return {
-            "has_conflicts": len(conflicts) > 0,
-            "conflicts": {str(port): services for port, services in conflicts.items()},
-            "message": f"Found {len(conflicts)} port conflicts"
-            if conflicts
-            else "No port conflicts",
-        }
+        return ORJSONResponse(
+            {
+                "has_conflicts": len(conflicts) > 0,
+                "conflicts": {
+                    str(port): services for port, services in conflicts.items()
+                },
+                "message": f"Found {len(conflicts)} port conflicts"
+                if conflicts
+                else "No port conflicts",
+            }
+        )
 
     @router.get("/ports/assignments")
     async def get_port_assignments(request: Request):
@@ -359,27 +555,38 @@ def create_api_router(agent) -> APIRouter:
         service_manager = agent.service_manager
         discovery = agent.discovery
 
-        assignments = service_manager.assign_non_conflicting_ports()
+        assignments = await asyncio.to_thread(
+            service_manager.assign_non_conflicting_ports
+        )
 
+        get_service = discovery.get_service
         result = []
         for service_id, ports in assignments.items():
-            service = discovery.get_service(service_id)
+            service = get_service(service_id)
             if not service or not service.capability:
                 continue
 
-            service_info = {"service_id": service_id, "name": service.name, "ports": {}}
-
-            for port_key, assigned_port in ports.items():
-                default_port = service.capability.ports[port_key].default
-                service_info["ports"][port_key] = {
-                    "default": default_port,
-                    "assigned": assigned_port,
-                    "changed": default_port != assigned_port,
+            defaults = {
+                key: default for key, default, _, _ in service.capability.port_table
+            }
+            result.append(
+                {
+                    "service_id": service_id,
+                    "name": service.name,
+                    "ports": {
+                        port_key: {
+                            "default": defaults[port_key],
+                            "assigned": assigned_port,
+                            "changed": defaults[port_key] != assigned_port,
+                        }
+                        for port_key, assigned_port in ports.items()
+                    },
                 }
+            )
 
-            result.append(service_info)
-
-        return {"assignments": result, "total_services": len(result)}
+        return ORJSONResponse(
+            {"assignments": result, "total_services": len(result)}
+        )
 
     @router.post("/services/{service_id}/start-auto")
     async def start_service_auto_ports(service_id: str, request: Request):
@@ -388,14 +595,16 @@ def create_api_router(agent) -> APIRouter:
 
         try:
             service = await service_manager.start_service_auto_ports(service_id)
-            return {
-                "success": True,
-                "service_id": service_id,
-                "status": service.status.value,
-                "pid": service.pid,
-                "assigned_ports": service.assigned_ports,
-                "message": f"Service started with auto-assigned ports: {service.assigned_ports}",
-            }
+            return ORJSONResponse(
+                {
+                    "success": True,
+                    "service_id": service_id,
+                    "status": service.status.value,
+                    "pid": service.pid,
+                    "assigned_ports": service.assigned_ports,
+                    "message": f"Service started with auto-assigned ports: {service.assigned_ports}",
+                }
+            )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
@@ -418,6 +627,7 @@ def create_api_router(agent) -> APIRouter:
             config.port_ranges.ui_port_max = body["ui_port_max"]
 
         config.save_config()
+        response_cache.clear()
 
         return {
             "success": True,
@@ -435,7 +645,7 @@ def create_api_router(agent) -> APIRouter:
         port_configurator = agent.port_configurator
         service_manager = agent.service_manager
 
-        conflicts_before = service_manager.get_port_conflicts()
+        conflicts_before = await asyncio.to_thread(service_manager.get_port_conflicts)
         if not conflicts_before:
             return {
                 "success": True,
@@ -444,7 +654,7 @@ def create_api_router(agent) -> APIRouter:
             }
 
         try:
-            results = port_configurator.resolve_all_conflicts()
+            results = await asyncio.to_thread(port_configurator.resolve_all_conflicts)
 
             changes = []
             for service_id, result in results.items():
@@ -491,10 +701,13 @@ def create_api_router(agent) -> APIRouter:
         port_configurator = agent.port_configurator
 
         try:
-            results = port_configurator.sync_all_readmes()
+            results = await asyncio.to_thread(port_configurator.sync_all_readmes)
 
-            synced_count = sum(1 for r in results.values() if r.get("synced"))
-            total_changes = sum(r.get("changes", 0) for r in results.values())
+            synced_count = total_changes = 0
+            for r in results.values():
+                if r.get("synced"):
+                    synced_count += 1
+                total_changes += r.get("changes", 0)
 
             return {
                 "success": True,
@@ -513,7 +726,9 @@ def create_api_router(agent) -> APIRouter:
         port_configurator = agent.port_configurator
 
         try:
-            result = port_configurator.sync_readme_with_env(service_id)
+            result = await asyncio.to_thread(
+                port_configurator.sync_readme_with_env, service_id
+            )
 
             if result.get("error"):
                 raise HTTPException(status_code=404, detail=result["error"])
@@ -536,21 +751,30 @@ def create_api_router(agent) -> APIRouter:
         """Get machine identification info and platform port ranges."""
         from agent.config import MACHINE_INFO, MACHINE_PORT_RANGES, CURRENT_PLATFORM
 
+        cached = response_cache.get("machine_info")
+        if cached is not None:
+            return cached
+
         config = agent.config
 
-        return {
-            "machine": MACHINE_INFO,
-            "platform": CURRENT_PLATFORM,
-            "port_ranges": {
-                "current": {
-                    "api_port_min": config.port_ranges.api_port_min,
-                    "api_port_max": config.port_ranges.api_port_max,
-                    "ui_port_min": config.port_ranges.ui_port_min,
-                    "ui_port_max": config.port_ranges.ui_port_max,
-                },
-                "all_platforms": MACHINE_PORT_RANGES,
-            },
-        }
+        return response_cache.store(
+            "machine_info",
+            ORJSONResponse(
+                {
+                    "machine": MACHINE_INFO,
+                    "platform": CURRENT_PLATFORM,
+                    "port_ranges": {
+                        "current": {
+                            "api_port_min": config.port_ranges.api_port_min,
+                            "api_port_max": config.port_ranges.api_port_max,
+                            "ui_port_min": config.port_ranges.ui_port_min,
+                            "ui_port_max": config.port_ranges.ui_port_max,
+                        },
+                        "all_platforms": MACHINE_PORT_RANGES,
+                    },
+                }
+            ),
+        )
 
     @router.post("/machine/generate-config")
     async def generate_machine_config_endpoint(request: Request):
@@ -558,7 +782,7 @@ def create_api_router(agent) -> APIRouter:
         from agent.config import generate_machine_config, MACHINE_SHORT_ID
 
         try:
-            output_path = generate_machine_config()
+            output_path = await asyncio.to_thread(generate_machine_config)
 
             return {
                 "success": True,
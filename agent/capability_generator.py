@@ -1,10 +1,19 @@
+import asyncio
+import hashlib
 import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Iterator, Optional
 
-import litellm
+import yaml
 
+from agent._yaml import SafeLoader
 from agent.config import AgentConfig
 
 logger = logging.getLogger("agent.capability_generator")
@@ -56,23 +65,22 @@ SKIP_DIRS = {
 
 MAX_FILE_CHARS = 15000
 MAX_TOTAL_CHARS = 120000
+MAX_READ_WORKERS = 32
+MAX_BATCH_SERVICES = 4
+MAX_BATCH_PROMPT_TOKENS = 100000
+SCHEMA_PROBE_CHARS = 8000
+TREE_SIZE_MIN_BYTES = 4096
 
-CAPABILITY_PROMPT = """You are analyzing a software service folder to generate a structured capability manifest.
+CAPABILITY_CACHE_DIR = Path.home() / ".white_mirror_agent" / "capability_cache"
 
-## Service Location
-Folder: {service_path}
-Service ID: {service_id}
-
-## Directory Structure
-{directory_tree}
-
-## File Contents
+# Called with (stage, payload) as a generation proceeds; see generate_capability.
+ProgressCallback = Callable[[str, Any], None]
 
-{file_contents}
+CAPABILITY_PROMPT_STATIC = """You are analyzing a software service folder to generate a structured capability manifest.
 
 ## Your Task
 
-Analyze ALL the provided files to understand:
+Analyze ALL the files provided in the service section below to understand:
 1. What this service does (purpose, capabilities)
 2. How to start it (command, virtual environment)
 3. What ports it uses (REST API, Gradio UI, etc.)
@@ -89,11 +97,11 @@ Generate a CAPABILITY.yaml file following this exact schema:
 
 ```yaml
 schema_version: "1.0"
-generated_at: "{timestamp}"
+generated_at: "<Generated At value from the service section>"
 generated_by: "service-agent/1.0.0"
 
 service:
-  id: "{service_id}"
+  id: "<Service ID from the service section>"
   name: "<human readable name from docs>"
   description: "<one line description>"
   version: "<version if found, else '1.0.0'>"
@@ -169,99 +177,590 @@ Output ONLY the YAML content, no explanations or markdown code blocks.
 """
 
 
+CAPABILITY_PROMPT_DYNAMIC = """## Service Location
+Folder: {service_path}
+Service ID: {service_id}
+Generated At: {timestamp}
+
+## Directory Structure
+{directory_tree}
+
+## File Contents
+
+{file_contents}
+"""
+
+
+CAPABILITY_BATCH_PROMPT = """The {count} service sections below each describe a separate service folder.
+Generate one CAPABILITY.yaml document per service, in the same order as the
+sections, and separate the documents with a line containing only ---.
+
+"""
+
+YAML_DOCUMENT_SEPARATOR = re.compile(r"^---[ \t]*$", re.MULTILINE)
+GENERATED_AT_LINE = re.compile(r"^Generated At: .*$", re.MULTILINE)
+
+
+_litellm = None
+
+
+def _import_litellm():
+    # litellm takes seconds to import, so it is kept off module import and off
+    # the event loop: warm_up() loads it in a thread, and the first completion
+    # waits for it via asyncio.to_thread if that has not finished yet.
+    global _litellm
+    import litellm
+
+    _litellm = litellm
+    return litellm
+
+
 class CapabilityGenerator:
-    def __init__(self, config: AgentConfig):
+    def __init__(self, config: AgentConfig, cache_dir: Optional[Path] = None):
         self.config = config
+        self.cache_dir = cache_dir or CAPABILITY_CACHE_DIR
+        # Upper bound on the number of cache files, None until the first scan.
+        self._cache_entries: Optional[int] = None
+        self._cache_lock = threading.Lock()
+
+    def warm_up(self):
+        """Start importing litellm in the background if generation is configured."""
+        if _litellm is not None or not self.config.get_llm_api_key():
+            return
+        threading.Thread(
+            target=_import_litellm, name="litellm-import", daemon=True
+        ).start()
+
+    async def generate_capability(
+        self,
+        service_path: Path,
+        force: bool = False,
+        progress: Optional[ProgressCallback] = None,
+    ) -> tuple[str, dict]:
+        """Generate a capability for one service.
+
+        ``force`` skips the disk cache lookup; the fresh result is still stored.
+        ``progress`` receives ("prompt_ready", prompt_chars) once the folder has
+        been read, ("cached", None) on a cache hit, ("requesting", model) before
+        each LLM call and ("chunk", text) for every piece of the streamed reply.
+        """
+        service_id, prompt = await asyncio.to_thread(
+            self._render_service_prompt, service_path
+        )
+        if progress:
+            progress("prompt_ready", len(prompt))
+        api_key = self._require_api_key()
 
-    async def generate_capability(self, service_path: Path) -> str:
-        service_id = service_path.name.lower().replace(" ", "_").replace("-", "_")
+        logger.info(
+            f"Generating capability for {service_id} using {self.config.llm.model}"
+        )
+        return await self._generate_single(
+            api_key, service_id, prompt, force, progress
+        )
 
-        dir_tree = self._build_directory_tree(service_path)
-        file_contents = self._gather_file_contents(service_path)
+    async def generate_capabilities_batch(
+        self, service_paths: list[Path], force: bool = False
+    ) -> dict[Path, tuple[str, dict]]:
+        """Generate capabilities for several services, sharing LLM calls.
+
+        Services are grouped into batches that fit the prompt budget and each
+        batch is answered with one YAML document per service. Services whose
+        document is missing or invalid are retried on their own; ones that still
+        fail are logged and left out of the result. ``force`` bypasses the disk
+        cache as in generate_capability.
+        """
         timestamp = datetime.now(timezone.utc).isoformat()
+        # Folder walks and cache reads are blocking, so both run in threads.
+        prompts = await asyncio.gather(
+            *(
+                asyncio.to_thread(self._render_service_prompt, path, timestamp)
+                for path in service_paths
+            )
+        )
+        rendered = [(path, *prompt) for path, prompt in zip(service_paths, prompts)]
+        api_key = self._require_api_key()
+
+        if force:
+            cached_results = [None] * len(rendered)
+        else:
+            cached_results = await asyncio.gather(
+                *(
+                    asyncio.to_thread(
+                        self._cached_capability, self._cache_key(prompt), service_id
+                    )
+                    for _, service_id, prompt in rendered
+                )
+            )
+
+        results: dict[Path, tuple[str, dict]] = {}
+        pending = []
+        for item, cached in zip(rendered, cached_results):
+            if cached is not None:
+                results[item[0]] = cached
+            else:
+                pending.append(item)
+
+        for batch in self._plan_batches(pending):
+            if len(batch) > 1:
+                generated = await self._generate_batch(api_key, batch)
+                await asyncio.gather(
+                    *(
+                        asyncio.to_thread(
+                            self._cache_put,
+                            self._cache_key(prompt),
+                            generated[path][0],
+                        )
+                        for path, _, prompt in batch
+                        if path in generated
+                    )
+                )
+                results.update(generated)
+
+            for path, service_id, prompt in batch:
+                if path in results:
+                    continue
+                try:
+                    results[path] = await self._generate_single(
+                        api_key, service_id, prompt, force
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to generate capability for {service_id}: {e}")
+
+        return results
+
+    def _render_service_prompt(
+        self, service_path: Path, timestamp: Optional[str] = None
+    ) -> tuple[str, str]:
+        service_id = service_path.name.lower().replace(" ", "_").replace("-", "_")
 
-        prompt = CAPABILITY_PROMPT.format(
+        index = self._index_service_tree(service_path)
+        dir_tree = self._build_directory_tree(service_path, index=index)
+        file_contents = self._gather_file_contents(service_path, index=index)
+
+        prompt = CAPABILITY_PROMPT_DYNAMIC.format(
             service_path=str(service_path),
             service_id=service_id,
             directory_tree=dir_tree,
             file_contents=file_contents,
-            timestamp=timestamp,
+            timestamp=timestamp or datetime.now(timezone.utc).isoformat(),
         )
+        return service_id, prompt
 
+    def _require_api_key(self) -> str:
         api_key = self.config.get_llm_api_key()
         if not api_key:
             raise ValueError(
                 "No LLM API key configured. Set OPENROUTER_API_KEY environment variable."
             )
+        return api_key
+
+    def _plan_batches(self, rendered: list[tuple[Path, str, str]]):
+        batch: list[tuple[Path, str, str]] = []
+        batch_tokens = 0
+
+        for item in rendered:
+            prompt = item[2]
+            if len(prompt) > MAX_TOTAL_CHARS:
+                yield [item]
+                continue
+
+            tokens = len(prompt) // 4
+            if batch and (
+                len(batch) >= MAX_BATCH_SERVICES
+                or batch_tokens + tokens > MAX_BATCH_PROMPT_TOKENS
+            ):
+                yield batch
+                batch, batch_tokens = [], 0
+
+            batch.append(item)
+            batch_tokens += tokens
+
+        if batch:
+            yield batch
+
+    async def _generate_single(
+        self,
+        api_key: str,
+        service_id: str,
+        prompt: str,
+        force: bool = False,
+        progress: Optional[ProgressCallback] = None,
+    ) -> tuple[str, dict]:
+        cache_key = self._cache_key(prompt)
+        if not force:
+            cached = await asyncio.to_thread(
+                self._cached_capability, cache_key, service_id
+            )
+            if cached is not None:
+                if progress:
+                    progress("cached", None)
+                return cached
+
+        content = await self._complete(api_key, prompt, service_id, progress)
+        yaml_content = self._clean_yaml(content)
 
+        data = self._validate_yaml(yaml_content)
+        await asyncio.to_thread(self._cache_put, cache_key, yaml_content)
+
+        logger.info(f"Successfully generated capability for {service_id}")
+        return yaml_content, data
+
+    def _cached_capability(
+        self, cache_key: str, service_id: str
+    ) -> Optional[tuple[str, dict]]:
+        cached = self._cache_get(cache_key)
+        if cached is None:
+            return None
+        try:
+            data = self._validate_yaml(cached)
+        except Exception as e:
+            logger.warning(f"Ignoring invalid cached capability for {service_id}: {e}")
+            return None
+        logger.info(f"Using cached capability for {service_id}")
+        return cached, data
+
+    def _cache_key(self, prompt: str) -> str:
+        # The timestamp line changes on every render, so it is kept out of the key.
+        stable_prompt = GENERATED_AT_LINE.sub("", prompt)
+        material = "\x00".join(
+            (self.config.llm.model, CAPABILITY_PROMPT_STATIC, stable_prompt)
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _cache_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        path = self._cache_path(key)
+        try:
+            st = path.stat()
+            if time.time() - st.st_mtime > self.config.llm.cache_ttl_days * 86400:
+                path.unlink(missing_ok=True)
+                return None
+            content = path.read_text(encoding="utf-8")
+            # atime tracks last use for eviction; mtime keeps the creation time
+            # the TTL is measured from.
+            os.utime(path, (time.time(), st.st_mtime))
+            return content
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to read capability cache entry {key}: {e}")
+            return None
+
+    def _cache_put(self, key: str, content: str):
+        path = self._cache_path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            is_new = not path.exists()
+            tmp_path.write_text(content, encoding="utf-8")
+            os.replace(tmp_path, path)
+            with self._cache_lock:
+                if is_new and self._cache_entries is not None:
+                    self._cache_entries += 1
+                # Only scan the cache when the count can be over the limit;
+                # overwrites and TTL expiry never push it up.
+                if (
+                    self._cache_entries is None
+                    or self._cache_entries > self.config.llm.cache_max_entries
+                ):
+                    self._evict_cache()
+        except OSError as e:
+            logger.warning(f"Failed to write capability cache entry {key}: {e}")
+
+    def _evict_cache(self):
+        max_entries = self.config.llm.cache_max_entries
+        entries = []
+        with os.scandir(self.cache_dir) as buckets:
+            for bucket in buckets:
+                if not bucket.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(bucket.path) as it:
+                    entries.extend(e for e in it if not e.name.endswith(".tmp"))
+
+        self._cache_entries = min(len(entries), max_entries)
+        if len(entries) <= max_entries:
+            return
+
+        entries.sort(key=lambda e: e.stat().st_atime)
+        for entry in entries[: len(entries) - max_entries]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    async def _generate_batch(
+        self, api_key: str, batch: list[tuple[Path, str, str]]
+    ) -> dict[Path, tuple[str, dict]]:
+        service_ids = [service_id for _, service_id, _ in batch]
+        label = ", ".join(service_ids)
         logger.info(
-            f"Generating capability for {service_id} using {self.config.llm.model}"
+            f"Generating capabilities for {label} using {self.config.llm.model}"
         )
 
+        sections = [
+            f"# Service {i} of {len(batch)}\n\n{prompt}"
+            for i, (_, _, prompt) in enumerate(batch, 1)
+        ]
+        prompt = CAPABILITY_BATCH_PROMPT.format(count=len(batch)) + "\n\n".join(
+            sections
+        )
+
+        try:
+            content = await self._complete(api_key, prompt, label)
+        except Exception as e:
+            logger.warning(f"Batch capability generation failed for {label}: {e}")
+            return {}
+
+        documents = [
+            cleaned
+            for document in YAML_DOCUMENT_SEPARATOR.split(self._clean_yaml(content))
+            if (cleaned := self._clean_yaml(document))
+        ]
+        if len(documents) != len(batch):
+            logger.warning(
+                f"Expected {len(batch)} capability documents for {label}, "
+                f"got {len(documents)}"
+            )
+            return {}
+
+        results = {}
+        for (path, service_id, _), document in zip(batch, documents):
+            try:
+                data = self._validate_yaml(document)
+            except Exception as e:
+                logger.warning(f"Invalid batched capability for {service_id}: {e}")
+                continue
+            results[path] = (document, data)
+            logger.info(f"Successfully generated capability for {service_id}")
+        return results
+
+    async def _complete(
+        self,
+        api_key: str,
+        prompt: str,
+        label: str,
+        progress: Optional[ProgressCallback] = None,
+    ) -> str:
+        attempts = max(1, self.config.llm.max_retries)
+        for attempt in range(1, attempts + 1):
+            if progress:
+                progress("requesting", self.config.llm.model)
+            content = await self._stream_completion(api_key, prompt, label, progress)
+            if content is not None:
+                return content
+            logger.warning(
+                f"LLM response for {label} had no schema_version after "
+                f"{SCHEMA_PROBE_CHARS} characters (attempt {attempt}/{attempts})"
+            )
+
+        raise ValueError(f"LLM did not return a capability manifest for {label}")
+
+    async def _stream_completion(
+        self,
+        api_key: str,
+        prompt: str,
+        label: str,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Optional[str]:
+        litellm = _litellm or await asyncio.to_thread(_import_litellm)
+
         response = await litellm.acompletion(
             model=f"openrouter/{self.config.llm.model}",
             api_key=api_key,
-            messages=[{"role": "user", "content": prompt}],
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": CAPABILITY_PROMPT_STATIC,
+                            "cache_control": {"type": "ephemeral"},
+                        },
+                        {"type": "text", "text": prompt},
+                    ],
+                }
+            ],
             max_tokens=16000,
             temperature=0.1,
             timeout=self.config.llm.timeout_seconds,
+            stream=True,
+            stream_options={"include_usage": True},
         )
 
-        yaml_content = response.choices[0].message.content
-        yaml_content = self._clean_yaml(yaml_content)
-
-        self._validate_yaml(yaml_content)
+        chunks = []
+        probe = ""
+        usage = None
+        try:
+            async for chunk in response:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                chunks.append(delta)
+                if progress:
+                    progress("chunk", delta)
+
+                # Give up early on responses that are not turning into a
+                # manifest instead of waiting for up to max_tokens of output.
+                if probe is not None:
+                    probe += delta
+                    if "schema_version" in probe:
+                        probe = None
+                    elif len(probe) > SCHEMA_PROBE_CHARS:
+                        return None
+        finally:
+            # Releases the HTTP stream on early exit or error; a no-op once
+            # the stream is exhausted.
+            aclose = getattr(response, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None)
+        if cached_tokens:
+            logger.info(f"Reused {cached_tokens} cached prompt tokens for {label}")
+
+        return "".join(chunks)
+
+    def _index_service_tree(
+        self, service_path: Path, max_depth: int = 3
+    ) -> dict[str, os.DirEntry]:
+        """Map relative paths to DirEntry objects from one walk of the folder.
+
+        Directories are descended ``max_depth`` levels, except ``src/`` which is
+        walked in full so every Python source is available to the prompt.
+        """
+        return dict(self._scandir_recursive(service_path, max_depth))
+
+    def _scandir_recursive(
+        self, path, max_depth: Optional[int] = None, prefix: str = ""
+    ) -> Iterator[tuple[str, os.DirEntry]]:
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            return
 
-        logger.info(f"Successfully generated capability for {service_id}")
-        return yaml_content
+        for entry in entries:
+            rel_path = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in SKIP_DIRS:
+                    continue
+                yield rel_path, entry
+                if max_depth is None or rel_path == "src":
+                    yield from self._scandir_recursive(entry.path, None, rel_path + "/")
+                elif max_depth > 0:
+                    yield from self._scandir_recursive(
+                        entry.path, max_depth - 1, rel_path + "/"
+                    )
+            else:
+                yield rel_path, entry
 
     def _build_directory_tree(
-        self, path: Path, prefix: str = "", max_depth: int = 3
+        self,
+        path: Path,
+        prefix: str = "",
+        max_depth: int = 3,
+        index: Optional[dict[str, os.DirEntry]] = None,
     ) -> str:
-        lines = []
+        if index is None:
+            index = self._index_service_tree(path, max_depth)
 
-        try:
-            entries = sorted(path.iterdir(), key=lambda e: (not e.is_dir(), e.name))
-        except PermissionError:
-            return f"{prefix}[Permission Denied]\n"
+        children: dict[str, list[tuple[str, os.DirEntry]]] = {}
+        for rel_path, entry in index.items():
+            children.setdefault(rel_path.rpartition("/")[0], []).append(
+                (rel_path, entry)
+            )
+
+        def sorted_children(rel_dir: str) -> list[tuple[str, os.DirEntry]]:
+            return sorted(
+                children.get(rel_dir, ()),
+                key=lambda item: (not item[1].is_dir(), item[1].name),
+            )
+
+        lines: list[str] = []
+        # Depth-first with an explicit stack; children are pushed in reverse so
+        # they pop in sorted order right after their directory's line.
+        stack = deque(
+            (rel_path, entry, prefix, max_depth)
+            for rel_path, entry in reversed(sorted_children(""))
+        )
+        while stack:
+            rel_path, entry, entry_prefix, depth = stack.pop()
 
-        for entry in entries:
             if entry.name.startswith(".") and entry.name not in [
                 ".env.example",
                 ".env.template",
             ]:
                 continue
-            if entry.is_dir() and entry.name in SKIP_DIRS:
+
+            is_dir = entry.is_dir()
+            if is_dir and entry.name in SKIP_DIRS:
                 continue
 
-            if entry.is_dir():
-                lines.append(f"{prefix}{entry.name}/")
-                if max_depth > 0:
-                    subtree = self._build_directory_tree(
-                        entry, prefix + "  ", max_depth - 1
+            if is_dir:
+                lines.append(f"{entry_prefix}{entry.name}/")
+                if depth > 0:
+                    stack.extend(
+                        (child_path, child, entry_prefix + "  ", depth - 1)
+                        for child_path, child in reversed(sorted_children(rel_path))
                     )
-                    if subtree:
-                        lines.append(subtree)
             else:
                 try:
                     size = entry.stat().st_size
-                    lines.append(f"{prefix}{entry.name} ({size} bytes)")
                 except OSError:
-                    lines.append(f"{prefix}{entry.name}")
+                    size = 0
+                if size > TREE_SIZE_MIN_BYTES:
+                    lines.append(f"{entry_prefix}{entry.name} ({size} bytes)")
+                else:
+                    lines.append(f"{entry_prefix}{entry.name}")
 
         return "\n".join(lines)
 
-    def _gather_file_contents(self, service_path: Path) -> str:
+    def _gather_file_contents(
+        self,
+        service_path: Path,
+        index: Optional[dict[str, os.DirEntry]] = None,
+    ) -> str:
+        if index is None:
+            index = self._index_service_tree(service_path)
+
+        priority = [
+            (filename, entry)
+            for filename in PRIORITY_FILES
+            if (entry := index.get(filename)) is not None and entry.is_file()
+        ]
+        priority_names = {filename for filename, _ in priority}
+        sources = [
+            (rel_path, entry)
+            for rel_path, entry in index.items()
+            if rel_path.startswith("src/")
+            and rel_path.endswith(".py")
+            and rel_path not in priority_names
+            and entry.is_file()
+        ]
+        if not priority and not sources:
+            return ""
+
         contents = []
         total_chars = 0
-        seen_files = set()
+        executor = ThreadPoolExecutor(
+            max_workers=min(MAX_READ_WORKERS, len(priority) + len(sources))
+        )
+        try:
+            texts = executor.map(
+                self._read_file_safe,
+                [Path(entry.path) for _, entry in priority + sources],
+            )
+            priority_texts = [next(texts) for _ in priority]
 
-        for filename in PRIORITY_FILES:
-            file_path = service_path / filename
-            if file_path.exists() and file_path.is_file():
-                content = self._read_file_safe(file_path)
+            for (filename, _), content in zip(priority, priority_texts):
                 if content:
-                    seen_files.add(str(file_path))
                     chunk = self._format_file_content(filename, content)
 
                     if total_chars + len(chunk) > MAX_TOTAL_CHARS:
@@ -270,25 +769,18 @@ class CapabilityGenerator:
                     contents.append(chunk)
                     total_chars += len(chunk)
 
-        if total_chars < MAX_TOTAL_CHARS:
-            src_path = service_path / "src"
-            if src_path.exists():
-                for py_file in src_path.rglob("*.py"):
-                    if str(py_file) in seen_files:
-                        continue
-
-                    content = self._read_file_safe(py_file)
+            if total_chars < MAX_TOTAL_CHARS:
+                for (rel_path, _), content in zip(sources, texts):
                     if content and len(content) > 100:
-                        rel_path = py_file.relative_to(service_path)
-                        chunk = self._format_file_content(
-                            str(rel_path), content, "python"
-                        )
+                        chunk = self._format_file_content(rel_path, content, "python")
 
                         if total_chars + len(chunk) > MAX_TOTAL_CHARS:
                             break
 
                         contents.append(chunk)
                         total_chars += len(chunk)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
         return "".join(contents)
 
@@ -298,17 +790,25 @@ class CapabilityGenerator:
             truncated += "\n... [truncated]"
         return f"\n### FILE: {filename}\n```{lang}\n{truncated}\n```\n"
 
-    def _read_file_safe(self, path: Path) -> Optional[str]:
+    def _read_file_safe(
+        self, path: Path, max_chars: int = MAX_FILE_CHARS
+    ) -> Optional[str]:
+        # One character past the limit lets _format_file_content mark truncation
+        # without loading the rest of a large file.
         try:
-            return path.read_text(encoding="utf-8")
+            return self._read_prefix(path, "utf-8", max_chars + 1)
         except UnicodeDecodeError:
             try:
-                return path.read_text(encoding="latin-1")
+                return self._read_prefix(path, "latin-1", max_chars + 1)
             except Exception:
                 return None
         except Exception:
             return None
 
+    def _read_prefix(self, path: Path, encoding: str, max_chars: int) -> str:
+        with path.open(encoding=encoding) as f:
+            return f.read(max_chars)
+
     def _clean_yaml(self, content: str) -> str:
         content = content.strip()
         if content.startswith("```yaml"):
@@ -319,10 +819,8 @@ class CapabilityGenerator:
             content = content[:-3]
         return content.strip()
 
-    def _validate_yaml(self, content: str):
-        import yaml
-
-        data = yaml.safe_load(content)
+    def _validate_yaml(self, content: str) -> dict:
+        data = yaml.load(content, Loader=SafeLoader)
 
         required = ["schema_version", "service", "runtime", "endpoints"]
         for field in required:
@@ -333,3 +831,5 @@ class CapabilityGenerator:
             logger.warning(
                 "Generated CAPABILITY.yaml missing runtime.ports - adding defaults"
             )
+
+        return data
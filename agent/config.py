@@ -1,13 +1,16 @@
+import functools
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 import os
 import platform
 import yaml
-from pydantic import BaseModel, Field, field_validator
 
+from agent._yaml import SafeDumper, SafeLoader
 from agent.machine_id import get_machine_identifier, get_short_machine_id
 
 
+@functools.lru_cache(maxsize=1)
 def detect_platform() -> str:
     system = platform.system().lower()
     if system == "darwin":
@@ -52,14 +55,23 @@ MACHINE_PORT_RANGES = {
 }
 
 
-class AgentSettings(BaseModel):
+def _from_dict(cls, data: Optional[dict]):
+    if data is None:
+        return cls()
+    names = {f.name for f in fields(cls) if f.init}
+    return cls(**{k: v for k, v in data.items() if k in names})
+
+
+@dataclass(slots=True)
+class AgentSettings:
     port: int = 9100
     host: str = "0.0.0.0"
     log_level: str = "INFO"
     log_file: Optional[str] = None
 
 
-class PortRangeSettings(BaseModel):
+@dataclass(slots=True)
+class PortRangeSettings:
     api_port_min: int = 8100
     api_port_max: int = 8299
     ui_port_min: int = 7800
@@ -68,27 +80,33 @@ class PortRangeSettings(BaseModel):
     sync_readme_on_resolve: bool = True
 
 
-class ResourceSettings(BaseModel):
+@dataclass(slots=True)
+class ResourceSettings:
     gpu_vram_reserve_gb: float = 2.0
     ram_reserve_gb: float = 4.0
     monitor_interval_seconds: int = 30
 
 
-class LLMSettings(BaseModel):
+@dataclass(slots=True)
+class LLMSettings:
     provider: str = "openrouter"
     model: str = "google/gemini-3-flash-preview"
     api_key: Optional[str] = None
     timeout_seconds: int = 120
     max_retries: int = 3
+    cache_ttl_days: int = 7
+    cache_max_entries: int = 256
 
 
-class HealthCheckSettings(BaseModel):
+@dataclass(slots=True)
+class HealthCheckSettings:
     enabled: bool = True
     interval_seconds: int = 60
     timeout_seconds: int = 5
 
 
-class UISettings(BaseModel):
+@dataclass(slots=True)
+class UISettings:
     enabled: bool = True
     share: bool = False
     auth: Optional[list] = None
@@ -96,38 +114,70 @@ class UISettings(BaseModel):
     theme: str = "soft"
 
 
-class AgentConfig(BaseModel):
+SECTION_TYPES = {
+    "agent": AgentSettings,
+    "resources": ResourceSettings,
+    "port_ranges": PortRangeSettings,
+    "llm": LLMSettings,
+    "health_check": HealthCheckSettings,
+    "ui": UISettings,
+}
+
+
+@dataclass(slots=True)
+class AgentConfig:
     machine_id: str
     machine_name: str = "Service Agent"
     machine_description: str = ""
     platform: str = CURRENT_PLATFORM
 
-    agent: AgentSettings = Field(default_factory=AgentSettings)
-    service_folders: list[str] = Field(default_factory=list)
-    always_running: list[str] = Field(default_factory=list)
-    resources: ResourceSettings = Field(default_factory=ResourceSettings)
-    port_ranges: PortRangeSettings = Field(default_factory=PortRangeSettings)
-    llm: LLMSettings = Field(default_factory=LLMSettings)
-    health_check: HealthCheckSettings = Field(default_factory=HealthCheckSettings)
-    ui: UISettings = Field(default_factory=UISettings)
-
-    _config_file: Optional[Path] = None
-
-    class Config:
-        arbitrary_types_allowed = True
-        underscore_attrs_are_private = True
-
-    @field_validator("service_folders", mode="before")
-    @classmethod
-    def resolve_paths(cls, v):
+    agent: AgentSettings = field(default_factory=AgentSettings)
+    service_folders: list[str] = field(default_factory=list)
+    always_running: list[str] = field(default_factory=list)
+    resources: ResourceSettings = field(default_factory=ResourceSettings)
+    port_ranges: PortRangeSettings = field(default_factory=PortRangeSettings)
+    llm: LLMSettings = field(default_factory=LLMSettings)
+    health_check: HealthCheckSettings = field(default_factory=HealthCheckSettings)
+    ui: UISettings = field(default_factory=UISettings)
+
+    _config_file: Optional[Path] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # Bumped by mark_changed() whenever settings are edited at runtime.
+    version: int = field(default=0, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.service_folders = self.resolve_paths(self.service_folders)
+        if self.always_running is None:
+            self.always_running = []
+
+    @staticmethod
+    def resolve_paths(v):
         if v is None:
             return []
-        return [str(Path(p).resolve()) if not Path(p).is_absolute() else p for p in v]
+        return [p if os.path.isabs(p) else str(Path(p).resolve()) for p in v]
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "AgentConfig":
+        kwargs = {}
+        for name, value in data.items():
+            section = SECTION_TYPES.get(name)
+            if section is not None:
+                if not isinstance(value, section):
+                    value = _from_dict(section, value)
+            elif name not in AGENT_CONFIG_FIELDS:
+                continue
+            kwargs[name] = value
+        return cls(**kwargs)
 
     def get_llm_api_key(self) -> Optional[str]:
         return self.llm.api_key or os.getenv("OPENROUTER_API_KEY")
 
+    def mark_changed(self):
+        self.version += 1
+
     def save_config(self):
+        self.mark_changed()
         if self._config_file is None:
             self._config_file = Path("./config.yaml")
 
@@ -169,14 +219,42 @@ class AgentConfig(BaseModel):
         }
 
         with open(self._config_file, "w") as f:
-            yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(
+                data, f, Dumper=SafeDumper, default_flow_style=False, sort_keys=False
+            )
+
+
+AGENT_CONFIG_FIELDS = frozenset(f.name for f in fields(AgentConfig) if f.init)
+
+
+_PORT_RANGE_CACHE: dict[tuple[str, str], tuple[Optional[float], dict]] = {}
 
 
 def get_default_port_ranges_for_machine(machine_id: str, platform_name: str) -> dict:
     machine_config_path = Path(f"./config.{machine_id}.yaml")
-    if machine_config_path.exists():
+    try:
+        mtime = machine_config_path.stat().st_mtime
+    except OSError:
+        mtime = None
+
+    key = (machine_id, platform_name)
+    cached = _PORT_RANGE_CACHE.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    port_ranges = _load_default_port_ranges(
+        machine_config_path if mtime is not None else None, platform_name
+    )
+    _PORT_RANGE_CACHE[key] = (mtime, port_ranges)
+    return port_ranges
+
+
+def _load_default_port_ranges(
+    machine_config_path: Optional[Path], platform_name: str
+) -> dict:
+    if machine_config_path is not None:
         with open(machine_config_path, "r") as f:
-            machine_data = yaml.safe_load(f) or {}
+            machine_data = yaml.load(f, Loader=SafeLoader) or {}
             if "port_ranges" in machine_data:
                 return machine_data["port_ranges"]
 
@@ -213,7 +291,7 @@ def load_config(config_path: Optional[str] = None) -> AgentConfig:
 
     if config_file:
         with open(config_file, "r") as f:
-            data = yaml.safe_load(f) or {}
+            data = yaml.load(f, Loader=SafeLoader) or {}
     else:
         data = {}
         config_file = Path("./config.yaml")
@@ -244,7 +322,7 @@ def load_config(config_path: Optional[str] = None) -> AgentConfig:
             machine_id, platform_name
         )
 
-    config = AgentConfig(**data)
+    config = AgentConfig.from_dict(data)
     config._config_file = Path(config_file) if config_file else Path("./config.yaml")
     return config
 
@@ -274,6 +352,12 @@ def generate_machine_config(output_path: Optional[str] = None) -> Path:
 
     output_file = Path(output_path)
     with open(output_file, "w") as f:
-        yaml.dump(config_data, f, default_flow_style=False, sort_keys=False)
+        yaml.dump(
+            config_data,
+            f,
+            Dumper=SafeDumper,
+            default_flow_style=False,
+            sort_keys=False,
+        )
 
     return output_file
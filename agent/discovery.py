@@ -1,10 +1,14 @@
+import asyncio
 import logging
+import os
 import re
+import stat
 from pathlib import Path
 from typing import Optional
 
 import yaml
 
+from agent._yaml import SafeLoader
 from agent.config import AgentConfig
 from agent.models import Service, ServiceStatus, ServiceCapability
 
@@ -12,61 +16,160 @@ logger = logging.getLogger("agent.discovery")
 
 CAPABILITY_FILENAME = "CAPABILITY.yaml"
 
+SERVICE_MARKER_FILES = frozenset(
+    {"README.md", "main.py", "app.py", CAPABILITY_FILENAME}
+)
+
+_SANITIZE_NONALNUM_RE = re.compile(r"[^a-z0-9_-]")
+_SANITIZE_COLLAPSE_RE = re.compile(r"_+")
+
 
 class ServiceDiscovery:
     def __init__(self, config: AgentConfig):
         self.config = config
         self._services: dict[str, Service] = {}
+        # Service id -> the configured folder it was discovered under.
+        self._origins: dict[str, str] = {}
+        self._snapshot: Optional[tuple[Service, ...]] = None
+        self.version = 0
+        self._subscribers: list[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+    def mark_changed(self):
+        self.version += 1
+        for loop, queue in self._subscribers:
+            try:
+                loop.call_soon_threadsafe(self._notify, queue)
+            except RuntimeError:
+                pass
+
+    @staticmethod
+    def _notify(queue: asyncio.Queue):
+        if queue.empty():
+            queue.put_nowait(None)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers = [
+            entry for entry in self._subscribers if entry[1] is not queue
+        ]
 
     def scan(self) -> list[Service]:
-        self._services.clear()
+        services: dict[str, Service] = {}
+        origins: dict[str, str] = {}
 
         for folder_path in self.config.service_folders:
-            folder = Path(folder_path)
-            if not folder.exists():
-                logger.warning(f"Service folder does not exist: {folder}")
-                continue
-
-            if not folder.is_dir():
-                logger.warning(f"Service folder is not a directory: {folder}")
-                continue
-
-            if self._is_valid_service(folder):
-                service = self._create_service(folder)
-                self._services[service.id] = service
-                logger.debug(f"Discovered service: {service.id} at {folder}")
-            else:
-                self._scan_folder(folder)
-
-        return list(self._services.values())
-
-    def _scan_folder(self, folder: Path):
-        for entry in folder.iterdir():
-            if not entry.is_dir():
-                continue
-
-            if entry.name.startswith(".") or entry.name.startswith("_"):
-                continue
-
-            if self._is_valid_service(entry):
-                service = self._create_service(entry)
-                self._services[service.id] = service
-                logger.debug(f"Discovered service: {service.id} at {entry}")
-
-    def _is_valid_service(self, path: Path) -> bool:
-        has_readme = (path / "README.md").exists()
-        has_main = (path / "main.py").exists()
-        has_app = (path / "app.py").exists()
-        has_capability = (path / CAPABILITY_FILENAME).exists()
-
-        return has_readme or has_main or has_app or has_capability
-
-    def _create_service(self, path: Path) -> Service:
+            found = self._discover_root(folder_path)
+            services.update(found)
+            origins.update(dict.fromkeys(found, folder_path))
+
+        self._replace_services(services, origins)
+
+        return list(services.values())
+
+    def scan_folder(self, folder_path: str) -> list[Service]:
+        """Rescan one configured folder, leaving services from the others alone."""
+        found = self._discover_root(folder_path)
+        services, origins = self._without_folder(folder_path)
+        services.update(found)
+        origins.update(dict.fromkeys(found, folder_path))
+        self._replace_services(services, origins)
+
+        return list(found.values())
+
+    def forget_folder(self, folder_path: str) -> list[Service]:
+        """Drop the services discovered under ``folder_path``.
+
+        A service it shadowed by id in another folder returns on the next scan().
+        """
+        removed = [
+            self._services[service_id]
+            for service_id, origin in self._origins.items()
+            if origin == folder_path
+        ]
+        self._replace_services(*self._without_folder(folder_path))
+
+        return removed
+
+    def _without_folder(
+        self, folder_path: str
+    ) -> tuple[dict[str, Service], dict[str, str]]:
+        origins = {
+            service_id: origin
+            for service_id, origin in self._origins.items()
+            if origin != folder_path
+        }
+        services = {
+            service_id: service
+            for service_id, service in self._services.items()
+            if service_id in origins
+        }
+        return services, origins
+
+    def _replace_services(self, services: dict[str, Service], origins: dict[str, str]):
+        # Swapped in whole so readers on other threads never see a partial map.
+        self._services = services
+        self._origins = origins
+        self._snapshot = None
+        self.mark_changed()
+
+    def _discover_root(self, folder_path: str) -> dict[str, Service]:
+        services: dict[str, Service] = {}
+        folder = Path(folder_path)
+        try:
+            folder_stat = os.stat(folder)
+        except OSError:
+            logger.warning(f"Service folder does not exist: {folder}")
+            return services
+
+        if not stat.S_ISDIR(folder_stat.st_mode):
+            logger.warning(f"Service folder is not a directory: {folder}")
+            return services
+
+        names = self._list_names(folder)
+        if self._is_valid_service(names):
+            service = self._create_service(folder, names)
+            services[service.id] = service
+            logger.debug(f"Discovered service: {service.id} at {folder}")
+        else:
+            self._scan_folder(folder, services)
+        return services
+
+    def _scan_folder(self, folder: Path, services: dict[str, Service]):
+        with os.scandir(folder) as it:
+            subdirs = [
+                entry
+                for entry in it
+                if entry.is_dir() and not entry.name.startswith((".", "_"))
+            ]
+
+        for entry in subdirs:
+            names = self._list_names(entry.path)
+            if self._is_valid_service(names):
+                path = Path(entry.path)
+                service = self._create_service(path, names)
+                services[service.id] = service
+                logger.debug(f"Discovered service: {service.id} at {path}")
+
+    def _list_names(self, path) -> set[str]:
+        try:
+            with os.scandir(path) as it:
+                return {entry.name for entry in it}
+        except OSError:
+            return set()
+
+    def _is_valid_service(self, names: set[str]) -> bool:
+        return not SERVICE_MARKER_FILES.isdisjoint(names)
+
+    def _create_service(self, path: Path, names: set[str]) -> Service:
         service_id = self._sanitize_id(path.name)
 
         capability = None
         capability_file = path / CAPABILITY_FILENAME
-        if capability_file.exists():
+        if CAPABILITY_FILENAME in names:
             try:
                 capability = self._load_capability(capability_file, service_id)
             except Exception as e:
@@ -78,56 +181,62 @@ class ServiceDiscovery:
 
     def _load_capability(self, path: Path, service_id: str) -> ServiceCapability:
         with open(path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, Loader=SafeLoader)
 
         return ServiceCapability.from_yaml(data, service_id)
 
     def _sanitize_id(self, name: str) -> str:
-        sanitized = name.lower()
-        sanitized = re.sub(r"[^a-z0-9_-]", "_", sanitized)
-        sanitized = re.sub(r"_+", "_", sanitized)
-        sanitized = sanitized.strip("_-")
-        return sanitized
+        sanitized = _SANITIZE_NONALNUM_RE.sub("_", name.lower())
+        return _SANITIZE_COLLAPSE_RE.sub("_", sanitized).strip("_-")
 
     def get_service(self, service_id: str) -> Optional[Service]:
         return self._services.get(service_id)
 
-    def get_all_services(self) -> list[Service]:
-        return list(self._services.values())
+    def get_all_services(self) -> tuple[Service, ...]:
+        if self._snapshot is None:
+            self._snapshot = tuple(self._services.values())
+        return self._snapshot
 
     def add_service_folder(self, folder_path: str) -> list[Service]:
         folder = Path(folder_path)
         if not folder.exists() or not folder.is_dir():
             raise ValueError(f"Invalid folder path: {folder_path}")
 
-        if folder_path not in self.config.service_folders:
-            self.config.service_folders.append(str(folder.resolve()))
-
-        new_services = []
-        self._scan_folder(folder)
+        resolved = str(folder.resolve())
+        if resolved not in self.config.service_folders:
+            self.config.service_folders.append(resolved)
 
-        return new_services
+        return self.scan_folder(resolved)
 
-    def refresh_service(self, service_id: str) -> Optional[Service]:
+    def refresh_service(
+        self, service_id: str, data: Optional[dict] = None
+    ) -> Optional[Service]:
         service = self._services.get(service_id)
         if not service:
             return None
 
         capability_file = service.path / CAPABILITY_FILENAME
-        if capability_file.exists():
+        if data is not None or capability_file.exists():
             try:
-                service.capability = self._load_capability(capability_file, service_id)
+                if data is None:
+                    service.capability = self._load_capability(
+                        capability_file, service_id
+                    )
+                else:
+                    service.capability = ServiceCapability.from_yaml(data, service_id)
+                service.invalidate_discover_cache()
                 if service.status == ServiceStatus.DISCOVERED:
                     service.status = ServiceStatus.READY
             except Exception as e:
                 logger.error(f"Failed to reload CAPABILITY.yaml for {service_id}: {e}")
                 service.error = str(e)
                 service.status = ServiceStatus.ERROR
+            self.mark_changed()
 
         return service
 
     def update_service_capability(
-        self, service_id: str, capability_yaml: str
+        self, service_id: str, capability_yaml: str, data: Optional[dict] = None
     ) -> Service:
         service = self._services.get(service_id)
         if not service:
@@ -137,7 +246,7 @@ class ServiceDiscovery:
         with open(capability_file, "w", encoding="utf-8") as f:
             f.write(capability_yaml)
 
-        refreshed = self.refresh_service(service_id)
+        refreshed = self.refresh_service(service_id, data)
         if refreshed is None:
             raise ValueError(f"Failed to refresh service: {service_id}")
         return refreshed
@@ -1,3 +1,4 @@
+import functools
 import hashlib
 import os
 import platform
@@ -7,6 +8,7 @@ from pathlib import Path
 from typing import Optional
 
 
+@functools.lru_cache(maxsize=1)
 def get_os_machine_id() -> Optional[str]:
     system = platform.system().lower()
 
@@ -73,6 +75,7 @@ def _get_linux_machine_id() -> Optional[str]:
     return None
 
 
+@functools.lru_cache(maxsize=8)
 def get_short_machine_id(length: int = 8) -> str:
     full_id = get_os_machine_id()
 
@@ -85,6 +88,7 @@ def get_short_machine_id(length: int = 8) -> str:
     return hash_digest[:length]
 
 
+@functools.lru_cache(maxsize=1)
 def get_machine_identifier() -> dict:
     os_id = get_os_machine_id()
     hostname = socket.gethostname()
@@ -1,9 +1,18 @@
+import asyncio
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
 from typing import Optional, Any
-import subprocess
+import time
+
+import yaml
+
+from agent._yaml import SafeDumper
+
+# Output lines kept per service; older lines are dropped as new ones arrive.
+MAX_LOG_LINES = 1000
 
 
 class ServiceStatus(str, Enum):
@@ -17,7 +26,7 @@ class ServiceStatus(str, Enum):
     ERROR = "error"
 
 
-@dataclass
+@dataclass(slots=True)
 class PortConfig:
     default: int
     env_var: Optional[str] = None
@@ -25,7 +34,7 @@ class PortConfig:
     description: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class ServiceCapability:
     schema_version: str
     service_id: str
@@ -54,6 +63,35 @@ class ServiceCapability:
 
     raw_yaml: dict = field(default_factory=dict)
 
+    port_table: tuple = field(init=False, repr=False, compare=False)
+    _rendered_yaml: Optional[str] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        self.port_table = tuple(
+            (key, pc.default, pc.env_var, pc.cli_arg) for key, pc in self.ports.items()
+        )
+
+    def rendered_yaml(self) -> str:
+        """raw_yaml dumped back to text, computed once per capability.
+
+        Capabilities are replaced rather than edited on refresh, so the cached
+        text cannot go stale.
+        """
+        if self._rendered_yaml is None:
+            self._rendered_yaml = (
+                yaml.dump(
+                    self.raw_yaml,
+                    Dumper=SafeDumper,
+                    default_flow_style=False,
+                    sort_keys=False,
+                )
+                if self.raw_yaml
+                else ""
+            )
+        return self._rendered_yaml
+
     @classmethod
     def from_yaml(cls, data: dict, service_id: str) -> "ServiceCapability":
         service_data = data.get("service", {})
@@ -62,14 +100,15 @@ class ServiceCapability:
         capabilities = data.get("capabilities", {})
         resources = data.get("resources", {})
 
-        ports = {}
-        for port_key, port_data in runtime.get("ports", {}).items():
-            ports[port_key] = PortConfig(
-                default=port_data.get("default", 8000),
-                env_var=port_data.get("env_var"),
-                cli_arg=port_data.get("cli_arg"),
-                description=port_data.get("description", ""),
+        ports = {
+            port_key: PortConfig(
+                port_data.get("default", 8000),
+                port_data.get("env_var"),
+                port_data.get("cli_arg"),
+                port_data.get("description", ""),
             )
+            for port_key, port_data in runtime.get("ports", {}).items()
+        }
 
         api_endpoint = endpoints.get("api", {})
 
@@ -97,7 +136,7 @@ class ServiceCapability:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Service:
     id: str
     path: Path
@@ -105,16 +144,29 @@ class Service:
     capability: Optional[ServiceCapability] = None
 
     pid: Optional[int] = None
-    process: Optional[subprocess.Popen] = None
+    process: Optional[asyncio.subprocess.Process] = None
     assigned_ports: dict[str, int] = field(default_factory=dict)
 
     start_time: Optional[datetime] = None
+    start_monotonic: Optional[float] = None
     error: Optional[str] = None
-    logs: list[str] = field(default_factory=lambda: [])
+    logs: deque[str] = field(default_factory=lambda: deque(maxlen=MAX_LOG_LINES))
 
     health_status: str = "unknown"
     last_health_check: Optional[datetime] = None
 
+    _discover_capability: Optional[dict] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _discover_ports: Optional[dict[str, int]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _last_check_iso: Optional[tuple[datetime, str]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _static_dict: Optional[tuple[ServiceStatus, Any, dict]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
     @property
     def name(self) -> str:
         if self.capability:
@@ -135,25 +187,104 @@ class Service:
 
     @property
     def uptime_seconds(self) -> Optional[float]:
-        if self.start_time and self.is_running:
-            return (datetime.now() - self.start_time).total_seconds()
-        return None
+        if self.start_monotonic is None or not self.is_running:
+            return None
+        return time.monotonic() - self.start_monotonic
+
+    def invalidate_discover_cache(self):
+        self._discover_capability = None
+        self._discover_ports = None
+
+    def get_discover_capability(self, configured_ports: dict[str, int]) -> dict:
+        if (
+            self._discover_capability is not None
+            and self._discover_ports == configured_ports
+        ):
+            return self._discover_capability
+
+        capability = self.capability
+        api_port_config = capability.ports.get("api")
+        ui_port_config = capability.ports.get("ui")
+
+        endpoints = {
+            "api": {
+                "port": configured_ports.get(
+                    "api", api_port_config.default if api_port_config else 8000
+                ),
+                "port_key": "api",
+                "health_check": capability.health_check_path,
+                "base_path": capability.api_base_path,
+                "docs": "/docs",
+            },
+        }
+        if ui_port_config:
+            endpoints["ui"] = {
+                "port": configured_ports.get("ui", ui_port_config.default),
+                "port_key": "ui",
+                "path": "/",
+            }
+
+        self._discover_capability = {
+            "runtime": {
+                "start_command": capability.start_command,
+                "working_directory": capability.working_directory,
+                "ports": {
+                    key: {
+                        "default": default,
+                        "configured": configured_ports.get(key, default),
+                        "env_var": env_var,
+                        "cli_arg": cli_arg,
+                    }
+                    for key, default, env_var, cli_arg in capability.port_table
+                },
+            },
+            "endpoints": endpoints,
+            "operations": capability.operations,
+            "inputs": capability.inputs,
+            "outputs": capability.outputs,
+        }
+        self._discover_ports = dict(configured_ports)
+        return self._discover_capability
+
+    def _last_check_isoformat(self) -> Optional[str]:
+        checked = self.last_health_check
+        if checked is None:
+            return None
+        cached = self._last_check_iso
+        if cached is None or cached[0] is not checked:
+            cached = self._last_check_iso = (checked, checked.isoformat())
+        return cached[1]
+
+    def _static_to_dict(self) -> dict:
+        # Everything here only changes with the status or the capability, so it
+        # is built once per (status, capability) pair and copied per call.
+        status = self.status
+        capability = self.capability
+        cached = self._static_dict
+        if cached is not None and cached[0] is status and cached[1] is capability:
+            return cached[2]
 
-    def to_dict(self) -> dict:
         result = {
             "id": self.id,
             "name": self.name,
             "path": str(self.path),
-            "status": self.status.value,
-            "has_capability": self.has_capability,
-            "needs_capability_generation": self.needs_capability,
+            # _value_ is a plain attribute; .value goes through a descriptor.
+            "status": status._value_,
+            "has_capability": capability is not None,
+            "needs_capability_generation": capability is None,
         }
 
-        if self.capability:
-            result["description"] = self.capability.description
-            result["version"] = self.capability.version
-            result["tags"] = self.capability.tags
-            result["operations"] = self.capability.operations
+        if capability:
+            result["description"] = capability.description
+            result["version"] = capability.version
+            result["tags"] = capability.tags
+            result["operations"] = capability.operations
+
+        self._static_dict = (status, capability, result)
+        return result
+
+    def to_dict(self) -> dict:
+        result = dict(self._static_to_dict())
 
         if self.is_running:
             result["pid"] = self.pid
@@ -161,9 +292,7 @@ class Service:
             result["uptime_seconds"] = self.uptime_seconds
             result["health"] = {
                 "status": self.health_status,
-                "last_check": self.last_health_check.isoformat()
-                if self.last_health_check
-                else None,
+                "last_check": self._last_check_isoformat(),
             }
 
         if self.error:
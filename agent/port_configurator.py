@@ -1,9 +1,14 @@
 import logging
+import os
 import re
+import shutil
+import tempfile
 from pathlib import Path
 from typing import Any, Optional
 
+from agent._env import invalidate_env, read_env_vars
 from agent.discovery import ServiceDiscovery
+from agent.models import Service
 from agent.service_manager import is_port_in_use
 
 logger = logging.getLogger("agent.port_configurator")
@@ -24,11 +29,28 @@ README_PORT_PATTERNS = [
     (r"(:)(\d{4,5})(?=[\s,\)\]\/\n]|$)", r"\g<1>{new_port}"),
 ]
 
+# All patterns as one alternation so a README is scanned once per update. Every
+# pattern captures the port as its second group.
+_README_PORT_RE = re.compile(
+    "|".join(
+        f"(?P<p{i}>{pattern})" for i, (pattern, _) in enumerate(README_PORT_PATTERNS)
+    )
+)
+_README_PORT_GROUPS = {
+    f"p{i}": _README_PORT_RE.groupindex[f"p{i}"] + 2
+    for i in range(len(README_PORT_PATTERNS))
+}
 
 class PortConfigurator:
     def __init__(self, discovery: ServiceDiscovery, port_ranges: dict):
         self.discovery = discovery
         self.port_ranges = port_ranges
+        # README text keyed by path, valid while the file's (st_mtime_ns, st_size)
+        # still matches. Parsed .env files live in the cache shared via agent._env.
+        self._readme_cache: dict[Path, tuple[tuple[int, int], str]] = {}
+        # Last conflict map, valid while discovery.version and the stat of every
+        # service's .env (or .env.example) source still match the key.
+        self._conflicts_cache: Optional[tuple[tuple, dict[int, list[str]]]] = None
 
     def get_env_file_path(self, service_path: Path) -> Path:
         return service_path / ".env"
@@ -37,33 +59,31 @@ class PortConfigurator:
         if not env_path.exists():
             example_path = env_path.parent / ".env.example"
             if example_path.exists():
-                return self._parse_env_file(example_path)
+                return read_env_vars(example_path)
             return {}
-        return self._parse_env_file(env_path)
-
-    def _parse_env_file(self, path: Path) -> dict[str, str]:
-        env_vars = {}
-        content = path.read_text(encoding='utf-8')
-        for line in content.splitlines():
-            line = line.strip()
-            if not line or line.startswith("#"):
+        return read_env_vars(env_path)
+
+    def _env_source_key(self, env_path: Path) -> Optional[tuple[str, int, int]]:
+        # Mirrors read_env_file: .env wins, .env.example is the fallback.
+        for path in (env_path, env_path.parent / ".env.example"):
+            try:
+                st = os.stat(path)
+            except OSError:
                 continue
-            if "=" in line:
-                key, _, value = line.partition("=")
-                key = key.strip()
-                value = value.strip().strip('"').strip("'")
-                env_vars[key] = value
-        return env_vars
+            return path.name, st.st_mtime_ns, st.st_size
+        return None
+
+    def _stat_key(self, path: Path) -> tuple[int, int]:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
 
     def write_env_file(self, env_path: Path, updates: dict[str, int]) -> None:
         if env_path.exists():
-            content = env_path.read_text(encoding='utf-8')
-            lines = content.splitlines()
+            lines = env_path.read_bytes().decode("utf-8").splitlines()
         else:
             example_path = env_path.parent / ".env.example"
             if example_path.exists():
-                content = example_path.read_text(encoding='utf-8')
-                lines = content.splitlines()
+                lines = example_path.read_bytes().decode("utf-8").splitlines()
             else:
                 lines = []
 
@@ -78,9 +98,6 @@ class PortConfigurator:
 
             key = stripped.split("=")[0].strip()
             if key in updates:
-                comment_match = re.match(r"^(\s*#?\s*)", line)
-                prefix = comment_match.group(1) if comment_match else ""
-                prefix = prefix.lstrip("#").lstrip()
                 new_lines.append(f"{key}={updates[key]}")
                 updated_keys.add(key)
                 logger.info(f"Updated {key}={updates[key]} in {env_path}")
@@ -93,7 +110,25 @@ class PortConfigurator:
                 new_lines.append(f"{key}={value}")
                 logger.info(f"Added {key}={value} to {env_path}")
 
-        env_path.write_text("\n".join(new_lines) + "\n", encoding='utf-8')
+        payload = b"\n".join(line.encode("utf-8") for line in new_lines) + b"\n"
+        # Write a private temp file beside the target and rename it over the
+        # original so readers never observe a partial .env. mkstemp creates it
+        # 0600; an existing file's mode is copied before any content is written.
+        # A symlinked .env is resolved first so the link itself survives.
+        target = env_path.resolve()
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=".env.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if target.exists():
+                    shutil.copymode(target, tmp_name)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, target)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        invalidate_env(env_path)
 
     def update_readme_ports(
         self, service_path: Path, port_changes: list[dict]
@@ -103,28 +138,29 @@ class PortConfigurator:
             logger.debug(f"No README.md found at {readme_path}")
             return {"updated": False, "changes_made": 0, "readme_path": None}
 
-        content = readme_path.read_text(encoding='utf-8')
+        content = self._read_readme(readme_path)
         original_content = content
-        total_changes = 0
 
+        # A substring test is far cheaper than the README patterns, so ports that
+        # never appear in the text are dropped before any regex runs.
+        port_map: dict[str, str] = {}
         for change in port_changes:
-            old_port = change["old_port"]
-            new_port = change["new_port"]
-
-            if old_port == new_port:
-                continue
-
-            changes_for_port = self._replace_port_in_readme(content, old_port, new_port)
-            if changes_for_port["count"] > 0:
-                content = changes_for_port["content"]
-                total_changes += changes_for_port["count"]
-                logger.info(
-                    f"README: Replaced {changes_for_port['count']} occurrences of "
-                    f"port {old_port} -> {new_port} in {readme_path.name}"
-                )
+            old_port = str(change["old_port"])
+            new_port = str(change["new_port"])
+            if old_port != new_port and old_port in content:
+                port_map.setdefault(old_port, new_port)
+
+        content, counts = self._replace_ports_in_readme(content, port_map)
+        total_changes = sum(counts.values())
+        for old_port, count in counts.items():
+            logger.info(
+                f"README: Replaced {count} occurrences of "
+                f"port {old_port} -> {port_map[old_port]} in {readme_path.name}"
+            )
 
         if content != original_content:
-            readme_path.write_text(content, encoding='utf-8')
+            readme_path.write_bytes(content.encode("utf-8"))
+            self._readme_cache[readme_path] = (self._stat_key(readme_path), content)
             logger.info(f"Updated README.md with {total_changes} port changes")
             return {
                 "updated": True,
@@ -134,35 +170,44 @@ class PortConfigurator:
 
         return {"updated": False, "changes_made": 0, "readme_path": str(readme_path)}
 
-    def _replace_port_in_readme(
-        self, content: str, old_port: int, new_port: int
-    ) -> dict[str, Any]:
-        count = 0
-        old_port_str = str(old_port)
-        new_port_str = str(new_port)
-
-        for pattern, replacement_template in README_PORT_PATTERNS:
-            replacement = replacement_template.format(new_port=new_port_str)
-
-            def replace_if_match(match):
-                nonlocal count
-                full_match = match.group(0)
-                port_in_match = None
-                for g in match.groups():
-                    if g and g.isdigit() and len(g) >= 4:
-                        port_in_match = g
-                        break
-
-                if port_in_match == old_port_str:
-                    count += 1
-                    return re.sub(r"\d{4,5}", new_port_str, full_match, count=1)
-                return full_match
-
-            content = re.sub(pattern, replace_if_match, content)
-
-        return {"content": content, "count": count}
-
-    def get_next_available_port(self, port_type: str, used_ports: set[int]) -> int:
+    def _read_readme(self, readme_path: Path) -> str:
+        stat_key = self._stat_key(readme_path)
+        cached = self._readme_cache.get(readme_path)
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+
+        content = readme_path.read_bytes().decode("utf-8")
+        self._readme_cache[readme_path] = (stat_key, content)
+        return content
+
+    def _replace_ports_in_readme(
+        self, content: str, port_map: dict[str, str]
+    ) -> tuple[str, dict[str, int]]:
+        counts: dict[str, int] = {}
+        if not port_map:
+            return content, counts
+
+        def replace_if_match(match):
+            group = _README_PORT_GROUPS[match.lastgroup]
+            old_port = match.group(group)
+            new_port = port_map.get(old_port)
+            if new_port is None:
+                return match.group(0)
+
+            counts[old_port] = counts.get(old_port, 0) + 1
+            start, end = match.span(group)
+            text = match.string
+            return text[match.start() : start] + new_port + text[end : match.end()]
+
+        return _README_PORT_RE.sub(replace_if_match, content), counts
+
+    def get_next_available_port(
+        self,
+        port_type: str,
+        used_ports: set[int],
+        probe_cache: Optional[dict[int, bool]] = None,
+        start: Optional[int] = None,
+    ) -> int:
         if port_type == "api":
             port_min = self.port_ranges.get("api_port_min", 8100)
             port_max = self.port_ranges.get("api_port_max", 8299)
@@ -172,8 +217,18 @@ class PortConfigurator:
         else:
             port_min, port_max = 8000, 9000
 
+        if probe_cache is None:
+            probe_cache = {}
+        if start is not None:
+            port_min = max(port_min, start)
+
         for port in range(port_min, port_max + 1):
-            if port not in used_ports and not is_port_in_use(port):
+            if port in used_ports:
+                continue
+            in_use = probe_cache.get(port)
+            if in_use is None:
+                in_use = probe_cache[port] = is_port_in_use(port)
+            if not in_use:
                 return port
 
         raise RuntimeError(
@@ -183,6 +238,9 @@ class PortConfigurator:
     def resolve_all_conflicts(self) -> dict[str, dict]:
         services = self.discovery.get_all_services()
         used_ports: set[int] = set()
+        # Probe results and per-type scan positions are only valid for this pass.
+        probe_cache: dict[int, bool] = {}
+        scan_cursor: dict[str, int] = {}
         results = {}
 
         for service in services:
@@ -209,8 +267,11 @@ class PortConfigurator:
                     used_ports.add(default_port)
                     continue
 
-                new_port = self.get_next_available_port(port_key, used_ports)
+                new_port = self.get_next_available_port(
+                    port_key, used_ports, probe_cache, scan_cursor.get(port_key)
+                )
                 used_ports.add(new_port)
+                scan_cursor[port_key] = new_port + 1
 
                 env_updates[env_var] = new_port
                 service_result["changes"].append(
@@ -280,7 +341,9 @@ class PortConfigurator:
         service = self.discovery.get_service(service_id)
         if not service or not service.capability:
             return {"synced": False, "error": "Service not found or no capability"}
+        return self._sync_service_readme(service)
 
+    def _sync_service_readme(self, service: Service) -> dict[str, Any]:
         env_path = self.get_env_file_path(service.path)
         env_vars = self.read_env_file(env_path)
 
@@ -322,19 +385,26 @@ class PortConfigurator:
         for service in services:
             if not service.capability:
                 continue
-            results[service.id] = self.sync_readme_with_env(service.id)
+            results[service.id] = self._sync_service_readme(service)
 
         return results
 
     def get_configured_port_conflicts(self) -> dict[int, list[str]]:
-        conflicts: dict[int, list[str]] = {}
-        services = self.discovery.get_all_services()
+        """Map each port configured for more than one service to its users.
+
+        The result is reused until a service or its .env changes, so callers
+        must not mutate it.
+        """
+        version = self.discovery.version
+        services = [s for s in self.discovery.get_all_services() if s.capability]
+        env_paths = [self.get_env_file_path(s.path) for s in services]
+        cache_key = (version, tuple(map(self._env_source_key, env_paths)))
+        cached = self._conflicts_cache
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
 
-        for service in services:
-            if not service.capability:
-                continue
-
-            env_path = self.get_env_file_path(service.path)
+        conflicts: dict[int, list[str]] = {}
+        for service, env_path in zip(services, env_paths):
             env_vars = self.read_env_file(env_path)
 
             for port_key, port_conf in service.capability.ports.items():
@@ -353,6 +423,8 @@ class PortConfigurator:
                     conflicts[port] = []
                 conflicts[port].append(f"{service.id}:{port_key}")
 
-        return {
+        conflicts = {
             port: svc_list for port, svc_list in conflicts.items() if len(svc_list) > 1
         }
+        self._conflicts_cache = (cache_key, conflicts)
+        return conflicts
@@ -1,14 +1,30 @@
+import asyncio
 import logging
 import platform
+import re
 import subprocess
-from typing import Optional
+import time
+from typing import Callable, Optional
 
+import orjson
 import psutil
 
 from agent.config import AgentConfig
 
 logger = logging.getLogger("agent.resources")
 
+# How long each section of get_all_stats() may be served from cache. GPU probes
+# can shell out to nvidia-smi/system_profiler, so they are refreshed less often.
+STATS_TTL_SECONDS = {"gpu": 2.0, "memory": 1.0, "cpu": 1.0, "disk": 10.0}
+
+# Age after which latest_stats() schedules a background refresh of its snapshot.
+STATS_SNAPSHOT_MAX_AGE_SECONDS = 1.0
+
+# Minimum delay between NVML initialization attempts when no GPU was found.
+NVML_RETRY_SECONDS = 60.0
+
+_VRAM_DIGITS_RE = re.compile(r"(\d+)")
+
 PYNVML_AVAILABLE = False
 pynvml = None
 
@@ -25,15 +41,33 @@ class ResourceMonitor:
         self.config = config
         self._nvidia_initialized = False
         self._nvidia_handle = None
+        self._nvidia_name: Optional[str] = None
         self._init_attempted = False
+        # GPU identity and VRAM reported by system_profiler are static.
+        self._apple_cache: Optional[dict] = None
+        self._last_init_attempt: Optional[float] = None
+        self._stats_cache: dict[str, tuple[float, dict]] = {}
+        self._snapshot: Optional[tuple[float, dict]] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._gpu_fallback_probe = self._select_gpu_fallback()
         self._try_init_nvidia()
+        # cpu_percent(interval=None) reports usage since the previous call, so
+        # prime it once here; the first real reading is then meaningful.
+        psutil.cpu_percent(interval=None)
 
     def _try_init_nvidia(self) -> bool:
         if self._nvidia_initialized:
             return True
         if not PYNVML_AVAILABLE:
             return False
-        
+        now = time.monotonic()
+        if (
+            self._last_init_attempt is not None
+            and now - self._last_init_attempt < NVML_RETRY_SECONDS
+        ):
+            return False
+        self._last_init_attempt = now
+
         try:
             pynvml.nvmlInit()
             device_count = pynvml.nvmlDeviceGetCount()
@@ -43,6 +77,7 @@ class ResourceMonitor:
                 name = pynvml.nvmlDeviceGetName(self._nvidia_handle)
                 if isinstance(name, bytes):
                     name = name.decode("utf-8")
+                self._nvidia_name = name
                 logger.info(f"NVIDIA GPU monitoring initialized: {name}")
                 return True
         except Exception as e:
@@ -52,18 +87,21 @@ class ResourceMonitor:
         self._init_attempted = True
         return False
 
+    def _select_gpu_fallback(self) -> Callable[[], dict]:
+        system = platform.system()
+        if system == "Darwin":
+            return self._get_apple_stats
+        if system == "Windows" and not PYNVML_AVAILABLE:
+            return self._get_nvidia_stats_fallback
+        return self._get_no_gpu_stats
+
+    def _get_no_gpu_stats(self) -> dict:
+        return {"available": False, "reason": "No GPU monitoring available"}
+
     def get_gpu_stats(self) -> dict:
-        if not self._nvidia_initialized:
-            self._try_init_nvidia()
-        
-        if self._nvidia_initialized and pynvml:
+        if self._try_init_nvidia():
             return self._get_nvidia_stats()
-        elif platform.system() == "Darwin":
-            return self._get_apple_stats()
-        elif platform.system() == "Windows":
-            return self._get_nvidia_stats_fallback()
-        else:
-            return {"available": False, "reason": "No GPU monitoring available"}
+        return self._gpu_fallback_probe()
 
     def _get_nvidia_stats(self) -> dict:
         try:
@@ -72,14 +110,11 @@ class ResourceMonitor:
             temp = pynvml.nvmlDeviceGetTemperature(
                 self._nvidia_handle, pynvml.NVML_TEMPERATURE_GPU
             )
-            name = pynvml.nvmlDeviceGetName(self._nvidia_handle)
-            if isinstance(name, bytes):
-                name = name.decode("utf-8")
 
             return {
                 "available": True,
                 "type": "nvidia",
-                "name": name,
+                "name": self._nvidia_name,
                 "vram_total_gb": round(info.total / (1024**3), 2),
                 "vram_used_gb": round(info.used / (1024**3), 2),
                 "vram_free_gb": round(info.free / (1024**3), 2),
@@ -90,18 +125,20 @@ class ResourceMonitor:
             logger.error(f"Failed to get NVIDIA stats: {e}")
             self._nvidia_initialized = False
             self._nvidia_handle = None
-            return self._get_nvidia_stats_fallback()
+            self._last_init_attempt = None
+            return {"available": False, "error": str(e)}
 
     def _get_nvidia_stats_fallback(self) -> dict:
         try:
             result = subprocess.run(
                 ["nvidia-smi", "--query-gpu=name,memory.total,memory.free,memory.used,utilization.gpu,temperature.gpu", "--format=csv,noheader,nounits"],
+                stdin=subprocess.DEVNULL,
                 capture_output=True,
                 text=True,
                 timeout=5,
             )
             if result.returncode == 0 and result.stdout.strip():
-                parts = result.stdout.strip().split(", ")
+                parts = result.stdout.strip().split(",")
                 if len(parts) >= 6:
                     name = parts[0].strip()
                     total_mb = float(parts[1].strip())
@@ -125,20 +162,19 @@ class ResourceMonitor:
         return {"available": False, "reason": "No NVIDIA GPU detected"}
 
     def _get_apple_stats(self) -> dict:
+        if self._apple_cache is not None:
+            return self._apple_cache
         try:
             result = subprocess.run(
                 ["system_profiler", "SPDisplaysDataType", "-json"],
                 capture_output=True,
-                text=True,
                 timeout=5,
             )
 
             if result.returncode != 0:
                 return {"available": False, "reason": "system_profiler failed"}
 
-            import json
-
-            data = json.loads(result.stdout)
+            data = orjson.loads(result.stdout)
             displays = data.get("SPDisplaysDataType", [])
 
             if not displays:
@@ -149,14 +185,12 @@ class ResourceMonitor:
 
             vram_str = gpu.get("spdisplays_vram", gpu.get("sppci_vram", "0"))
             if isinstance(vram_str, str):
-                import re
-
-                match = re.search(r"(\d+)", vram_str)
+                match = _VRAM_DIGITS_RE.search(vram_str)
                 vram_mb = int(match.group(1)) if match else 0
             else:
                 vram_mb = vram_str
 
-            return {
+            self._apple_cache = {
                 "available": True,
                 "type": "apple",
                 "name": gpu_name,
@@ -166,6 +200,7 @@ class ResourceMonitor:
                 "utilization_percent": None,
                 "temperature_celsius": None,
             }
+            return self._apple_cache
         except Exception as e:
             logger.error(f"Failed to get Apple GPU stats: {e}")
             return {"available": False, "error": str(e)}
@@ -190,7 +225,7 @@ class ResourceMonitor:
 
     def get_cpu_stats(self) -> dict:
         return {
-            "percent": psutil.cpu_percent(interval=0.1),
+            "percent": psutil.cpu_percent(interval=None),
             "cores": psutil.cpu_count(),
             "cores_physical": psutil.cpu_count(logical=False),
         }
@@ -209,14 +244,55 @@ class ResourceMonitor:
         except Exception as e:
             return {"error": str(e)}
 
+    def _cached_stats(self, key: str, probe: Callable[[], dict]) -> dict:
+        now = time.monotonic()
+        cached = self._stats_cache.get(key)
+        if cached is not None and now < cached[0]:
+            return cached[1]
+        value = probe()
+        self._stats_cache[key] = (now + STATS_TTL_SECONDS[key], value)
+        return value
+
     def get_all_stats(self) -> dict:
         return {
-            "gpu": self.get_gpu_stats(),
-            "memory": self.get_memory_stats(),
-            "cpu": self.get_cpu_stats(),
-            "disk": self.get_disk_stats(),
+            "gpu": self._cached_stats("gpu", self.get_gpu_stats),
+            "memory": self._cached_stats("memory", self.get_memory_stats),
+            "cpu": self._cached_stats("cpu", self.get_cpu_stats),
+            "disk": self._cached_stats("disk", self.get_disk_stats),
         }
 
+    def refresh_stats(self) -> dict:
+        stats = self.get_all_stats()
+        self._snapshot = (time.monotonic(), stats)
+        return stats
+
+    def latest_stats(self) -> dict:
+        """Return the last stats snapshot without probing on the event loop.
+
+        A stale snapshot is still served while a refresh runs in a worker thread.
+        Without a snapshot, or outside a running loop, the refresh runs inline.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh_stats()
+
+        stale = time.monotonic() - snapshot[0] >= STATS_SNAPSHOT_MAX_AGE_SECONDS
+        if stale and self._refresh_task is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return self.refresh_stats()
+            self._refresh_task = loop.create_task(self._refresh_in_thread())
+        return snapshot[1]
+
+    async def _refresh_in_thread(self):
+        try:
+            await asyncio.to_thread(self.refresh_stats)
+        except Exception as e:
+            logger.warning(f"Failed to refresh resource stats: {e}")
+        finally:
+            self._refresh_task = None
+
     def check_resources_available(
         self,
         required_vram_gb: Optional[float] = None,
@@ -1,17 +1,23 @@
 import asyncio
 import logging
 import os
+import random
+import re
+import shlex
 import signal
 import socket
-import subprocess
 import sys
-import threading
+import time
 from datetime import datetime
+from functools import lru_cache
+from itertools import chain, islice
 from pathlib import Path
 from typing import Optional
 
 import httpx
+import psutil
 
+from agent._env import read_env_vars
 from agent.config import AgentConfig
 from agent.discovery import ServiceDiscovery
 from agent.models import Service, ServiceStatus
@@ -19,6 +25,18 @@ from agent.resource_monitor import ResourceMonitor
 
 logger = logging.getLogger("agent.service_manager")
 
+# Readiness polling backoff (seconds)
+READY_PROBE_INITIAL_DELAY = 0.1
+READY_PROBE_MAX_DELAY = 2.0
+READY_PROBE_CONNECTED_MAX_DELAY = 0.5
+
+# How long a service without a health check must stay up to count as started
+STARTUP_LIVENESS_SECONDS = 0.25
+
+# Time a service gets to exit after SIGTERM, then after SIGKILL (seconds)
+STOP_GRACE_SECONDS = 10.0
+STOP_KILL_WAIT_SECONDS = 5.0
+
 
 def is_port_in_use(port: int) -> bool:
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -29,20 +47,114 @@ def is_port_in_use(port: int) -> bool:
             return True
 
 
+# Anything the shell would interpret beyond plain words and quoting, including
+# a leading VAR=value assignment; such commands still run through the shell.
+_SHELL_SYNTAX_RE = re.compile(r"[|&;<>()$`*?\[\]{}~#\n]|^\s*[A-Za-z_][A-Za-z0-9_]*=")
+
+
+@lru_cache(maxsize=128)
+def split_start_command(command: str) -> Optional[tuple[str, ...]]:
+    """Tokenize a start command so it can be exec'd without /bin/sh.
+
+    Returns None when the command needs a shell (or on Windows, where commands
+    keep going through the shell as before).
+    """
+    if sys.platform == "win32" or _SHELL_SYNTAX_RE.search(command):
+        return None
+    try:
+        argv = tuple(shlex.split(command))
+    except ValueError:
+        return None
+    return argv or None
+
+
+_PROC_NET_TCP = ("/proc/net/tcp", "/proc/net/tcp6")
+
+
+def snapshot_listening_ports() -> set[int]:
+    """Return the TCP ports currently in LISTEN state, in one batch read.
+
+    Ports in the snapshot are known to be taken, so allocators can skip them
+    without a bind() probe. An empty set is returned if the table cannot be
+    read; callers still confirm candidates with is_port_in_use().
+    """
+    ports: set[int] = set()
+    if sys.platform.startswith("linux"):
+        for table in _PROC_NET_TCP:
+            try:
+                with open(table, "rb") as f:
+                    next(f, None)
+                    for line in f:
+                        fields = line.split(None, 4)
+                        if len(fields) > 3 and fields[3] == b"0A":
+                            ports.add(int(fields[1].rpartition(b":")[2], 16))
+            except OSError:
+                continue
+        return ports
+
+    try:
+        connections = psutil.net_connections(kind="inet")
+    except (psutil.AccessDenied, OSError):
+        return ports
+    for conn in connections:
+        if conn.status == psutil.CONN_LISTEN and conn.laddr:
+            ports.add(conn.laddr.port)
+    return ports
+
+
 class ServiceManager:
     def __init__(
         self,
         config: AgentConfig,
         discovery: ServiceDiscovery,
         resource_monitor: ResourceMonitor,
+        http_client: Optional[httpx.AsyncClient] = None,
     ):
         self.config = config
         self.discovery = discovery
         self.resource_monitor = resource_monitor
-        self._log_threads: dict[str, threading.Thread] = {}
+        self._http_client = http_client
+        self._log_tasks: dict[str, asyncio.Task] = {}
+        # Serializes start/stop/restart per service so concurrent requests
+        # cannot both pass the is_running check and launch two processes.
+        self._locks: dict[str, asyncio.Lock] = {}
+        # Copying os.environ goes through its encode/decode proxy on every key,
+        # so the agent's environment is captured once and plain-copied per start.
+        self._base_env: dict[str, str] = dict(os.environ)
+        # Where the next unhinted port search per type resumes.
+        self._next_free: dict[str, int] = {}
+        # Ports picked by start_service_auto_ports for starts still in flight,
+        # which aren't RUNNING yet and may not have bound their ports.
+        self._reserved_ports: dict[str, dict[str, int]] = {}
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient()
+        return self._http_client
+
+    def _has_exited(self, service: Service) -> bool:
+        # asyncio reaps the child itself and records returncode on exit.
+        return service.process is not None and service.process.returncode is not None
+
+    def _set_status(self, service: Service, status: ServiceStatus):
+        service.status = status
+        self.discovery.mark_changed()
+
+    def _service_lock(self, service_id: str) -> asyncio.Lock:
+        lock = self._locks.get(service_id)
+        if lock is None:
+            lock = self._locks[service_id] = asyncio.Lock()
+        return lock
 
     async def start_service(
         self, service_id: str, port_assignments: Optional[dict[str, int]] = None
+    ) -> Service:
+        async with self._service_lock(service_id):
+            return await self._start_service(service_id, port_assignments)
+
+    async def _start_service(
+        self, service_id: str, port_assignments: Optional[dict[str, int]]
     ) -> Service:
         service = self.discovery.get_service(service_id)
         if not service:
@@ -56,7 +168,8 @@ class ServiceManager:
 
         capability = service.capability
 
-        ok, reason = self.resource_monitor.check_resources_available(
+        ok, reason = await asyncio.to_thread(
+            self.resource_monitor.check_resources_available,
             required_vram_gb=capability.min_vram_gb,
             required_ram_gb=capability.min_ram_gb,
             gpu_required=capability.gpu_required,
@@ -64,7 +177,7 @@ class ServiceManager:
         if not ok:
             raise ValueError(f"Cannot start {service_id}: {reason}")
 
-        env = os.environ.copy()
+        env = self._base_env.copy()
 
         configured_ports = self._get_configured_ports(service)
         assigned_ports = port_assignments or {}
@@ -88,56 +201,75 @@ class ServiceManager:
             cwd = service.path / capability.working_directory
 
         cmd = capability.start_command
+        argv = split_start_command(cmd)
 
+        python = None
         if capability.venv_path:
             venv_path = service.path / capability.venv_path
             if sys.platform == "win32":
                 python = venv_path / "Scripts" / "python.exe"
             else:
                 python = venv_path / "bin" / "python"
-
-            if python.exists():
-                cmd = cmd.replace("python ", f"{python} ", 1)
-                cmd = cmd.replace("python3 ", f"{python} ", 1)
+            if not python.exists():
+                python = None
+
+        if argv is not None:
+            args = list(argv)
+            if python and args[0] in ("python", "python3"):
+                args[0] = str(python)
+            cmd = shlex.join(args)
+        elif python:
+            cmd = cmd.replace("python ", f"{python} ", 1)
+            cmd = cmd.replace("python3 ", f"{python} ", 1)
 
         logger.info(f"Starting {service_id}: {cmd}")
         logger.debug(f"  Working directory: {cwd}")
         logger.debug(f"  Ports: {assigned_ports}")
 
-        service.status = ServiceStatus.STARTING
+        self._set_status(service, ServiceStatus.STARTING)
         service.assigned_ports = assigned_ports
         service.error = None
 
         try:
-            process = subprocess.Popen(
-                cmd,
-                shell=True,
+            # Only arguments that keep CPython's vfork() launch path: options such
+            # as preexec_fn, start_new_session or user/group switches force a
+            # full fork() that copies the agent's page tables.
+            popen_kwargs = dict(
                 cwd=str(cwd),
                 env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
             )
+            if argv is not None:
+                process = await asyncio.create_subprocess_exec(*args, **popen_kwargs)
+            else:
+                process = await asyncio.create_subprocess_shell(cmd, **popen_kwargs)
 
             service.process = process
             service.pid = process.pid
             service.start_time = datetime.now()
+            service.start_monotonic = time.monotonic()
 
             self._start_log_capture(service)
 
             if capability.health_check_path:
                 await self._wait_for_ready(service)
             else:
-                await asyncio.sleep(2)
-                if process.poll() is not None:
+                # Without a health check, only an immediate crash can be caught;
+                # later exits surface through check_service_health.
+                exited = asyncio.ensure_future(process.wait())
+                try:
+                    await asyncio.wait({exited}, timeout=STARTUP_LIVENESS_SECONDS)
+                finally:
+                    exited.cancel()
+                if self._has_exited(service):
                     raise RuntimeError(f"Process exited with code {process.returncode}")
 
-            service.status = ServiceStatus.RUNNING
+            self._set_status(service, ServiceStatus.RUNNING)
             logger.info(f"Service {service_id} started (PID: {service.pid})")
 
         except Exception as e:
-            service.status = ServiceStatus.FAILED
+            self._set_status(service, ServiceStatus.FAILED)
             service.error = str(e)
             logger.error(f"Failed to start {service_id}: {e}")
             raise
@@ -148,86 +280,124 @@ class ServiceManager:
         if not service.capability or not service.capability.health_check_path:
             return
 
-        api_port = service.assigned_ports.get("api")
-        if not api_port:
+        health_url = self._health_url(service)
+        if not health_url:
             return
 
-        health_url = (
-            f"http://localhost:{api_port}{service.capability.health_check_path}"
-        )
-
         start_time = asyncio.get_event_loop().time()
 
-        async with httpx.AsyncClient() as client:
+        # Probe immediately, then back off exponentially with a little jitter.
+        # Once the port accepts connections the service is close to ready, so
+        # the delay is capped lower to catch the first healthy response sooner.
+        delay = READY_PROBE_INITIAL_DELAY
+        max_delay = READY_PROBE_MAX_DELAY
+        exited = (
+            asyncio.ensure_future(service.process.wait()) if service.process else None
+        )
+        try:
             while asyncio.get_event_loop().time() - start_time < timeout:
-                if service.process and service.process.poll() is not None:
+                if self._has_exited(service):
                     raise RuntimeError(f"Process exited during startup")
 
-                try:
-                    response = await client.get(health_url, timeout=2)
-                    if response.status_code == 200:
-                        logger.debug(f"Health check passed for {service.id}")
-                        return
-                except (httpx.ConnectError, httpx.TimeoutException):
-                    pass
-
-                await asyncio.sleep(1)
+                status_code, _, connected = await self._probe_health(
+                    health_url, timeout=2
+                )
+                if status_code == 200:
+                    logger.debug(f"Health check passed for {service.id}")
+                    return
+                if connected:
+                    max_delay = READY_PROBE_CONNECTED_MAX_DELAY
+
+                delay = min(delay, max_delay)
+                pause = delay + random.uniform(0, delay * 0.1)
+                if exited is not None:
+                    # Wake early if the process dies while we wait.
+                    await asyncio.wait({exited}, timeout=pause)
+                else:
+                    await asyncio.sleep(pause)
+                delay = min(delay * 2, max_delay)
+        finally:
+            if exited is not None:
+                exited.cancel()
 
         raise TimeoutError(
             f"Service {service.id} did not become ready within {timeout}s"
         )
 
     def _start_log_capture(self, service: Service):
-        def capture_logs():
-            if not service.process or not service.process.stdout:
-                return
-
-            for line in service.process.stdout:
-                line = line.rstrip()
-                service.logs.append(line)
-                if len(service.logs) > 1000:
-                    service.logs = service.logs[-500:]
-                logger.debug(f"[{service.id}] {line}")
+        if not service.process or not service.process.stdout:
+            return
+        self._log_tasks[service.id] = asyncio.create_task(
+            self._drain_logs(service, service.process.stdout)
+        )
 
-        thread = threading.Thread(target=capture_logs, daemon=True)
-        thread.start()
-        self._log_threads[service.id] = thread
+    async def _drain_logs(self, service: Service, stream: asyncio.StreamReader):
+        while True:
+            try:
+                raw = await stream.readline()
+            except ValueError:
+                # Line exceeded the reader limit; the reader has discarded it.
+                continue
+            if not raw:
+                break
+            line = raw.decode("utf-8", errors="replace").rstrip()
+            service.logs.append(line)
+            # Lazy %-formatting: this runs per output line and DEBUG is usually off.
+            logger.debug("[%s] %s", service.id, line)
 
     async def stop_service(self, service_id: str, force: bool = False) -> Service:
+        async with self._service_lock(service_id):
+            return await self._stop_service(service_id)
+
+    async def _stop_service(self, service_id: str) -> Service:
         service = self.discovery.get_service(service_id)
         if not service:
             raise ValueError(f"Service not found: {service_id}")
 
         if not service.process:
-            service.status = ServiceStatus.STOPPED
+            self._set_status(service, ServiceStatus.STOPPED)
             return service
 
-        service.status = ServiceStatus.STOPPING
+        self._set_status(service, ServiceStatus.STOPPING)
         logger.info(f"Stopping {service_id} (PID: {service.pid})")
 
         try:
-            if sys.platform == "win32":
-                service.process.terminate()
-            else:
-                service.process.send_signal(signal.SIGTERM)
+            try:
+                if sys.platform == "win32":
+                    service.process.terminate()
+                else:
+                    service.process.send_signal(signal.SIGTERM)
+            except ProcessLookupError:
+                pass
 
             try:
-                service.process.wait(timeout=10)
-            except subprocess.TimeoutExpired:
+                await asyncio.wait_for(
+                    service.process.wait(), timeout=STOP_GRACE_SECONDS
+                )
+            except asyncio.TimeoutError:
                 logger.warning(
                     f"Service {service_id} did not stop gracefully, force killing"
                 )
-                service.process.kill()
-                service.process.wait(timeout=5)
+                try:
+                    service.process.kill()
+                except ProcessLookupError:
+                    pass
+                await asyncio.wait_for(
+                    service.process.wait(), timeout=STOP_KILL_WAIT_SECONDS
+                )
 
-            service.status = ServiceStatus.STOPPED
+            log_task = self._log_tasks.pop(service_id, None)
+            if log_task is not None and not log_task.done():
+                log_task.cancel()
+
+            self._set_status(service, ServiceStatus.STOPPED)
             service.pid = None
             service.process = None
             service.assigned_ports = {}
             logger.info(f"Service {service_id} stopped")
 
         except Exception as e:
-            service.status = ServiceStatus.FAILED
+            self._set_status(service, ServiceStatus.FAILED)
             service.error = str(e)
             logger.error(f"Failed to stop {service_id}: {e}")
             raise
@@ -237,27 +407,36 @@ class ServiceManager:
     async def restart_service(
         self, service_id: str, port_assignments: Optional[dict[str, int]] = None
     ) -> Service:
-        service = self.discovery.get_service(service_id)
-        if not service:
-            raise ValueError(f"Service not found: {service_id}")
+        async with self._service_lock(service_id):
+            service = self.discovery.get_service(service_id)
+            if not service:
+                raise ValueError(f"Service not found: {service_id}")
 
-        old_ports = service.assigned_ports.copy() if service.assigned_ports else None
+            old_ports = (
+                service.assigned_ports.copy() if service.assigned_ports else None
+            )
 
-        if service.is_running:
-            await self.stop_service(service_id)
-            await asyncio.sleep(1)
+            if service.is_running:
+                await self._stop_service(service_id)
+                await asyncio.sleep(1)
 
-        ports_to_use = port_assignments or old_ports
-        return await self.start_service(service_id, ports_to_use)
+            ports_to_use = port_assignments or old_ports
+            return await self._start_service(service_id, ports_to_use)
 
     async def stop_all_services(self):
-        services = self.discovery.get_all_services()
-        for service in services:
-            if service.is_running:
-                try:
-                    await self.stop_service(service.id)
-                except Exception as e:
-                    logger.error(f"Failed to stop {service.id}: {e}")
+        """Stop every running service concurrently.
+
+        Each stop is bounded by STOP_GRACE_SECONDS plus STOP_KILL_WAIT_SECONDS,
+        so shutdown takes at most that long however many services are stuck.
+        """
+        running = [s for s in self.discovery.get_all_services() if s.is_running]
+        results = await asyncio.gather(
+            *(self.stop_service(service.id) for service in running),
+            return_exceptions=True,
+        )
+        for service, result in zip(running, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to stop {service.id}: {result}")
 
     async def check_service_health(self, service_id: str) -> dict:
         service = self.discovery.get_service(service_id)
@@ -267,58 +446,66 @@ class ServiceManager:
         if not service.is_running:
             return {"status": "not_running"}
 
-        if service.process and service.process.poll() is not None:
-            service.status = ServiceStatus.FAILED
+        if self._has_exited(service):
+            self._set_status(service, ServiceStatus.FAILED)
             service.error = f"Process exited with code {service.process.returncode}"
             return {"status": "crashed", "exit_code": service.process.returncode}
 
         if not service.capability or not service.capability.health_check_path:
             return {"status": "unknown", "reason": "No health check configured"}
 
+        health_url = self._health_url(service)
+        if not health_url:
+            return {"status": "unknown", "reason": "No API port assigned"}
+
+        try:
+            start = asyncio.get_event_loop().time()
+            status_code, reason, _ = await self._probe_health(
+                health_url, timeout=self.config.health_check.timeout_seconds
+            )
+            response_time = (asyncio.get_event_loop().time() - start) * 1000
+        except Exception as e:
+            service.health_status = "error"
+            return {"status": "error", "reason": str(e)}
+
+        if status_code == 200:
+            service.health_status = "healthy"
+            service.last_health_check = datetime.now()
+            return {"status": "healthy", "response_time_ms": round(response_time, 2)}
+
+        service.health_status = "unhealthy"
+        return {"status": "unhealthy", "reason": reason or f"HTTP {status_code}"}
+
+    def _health_url(self, service: Service) -> Optional[str]:
         api_port = service.assigned_ports.get("api")
         if not api_port:
-            return {"status": "unknown", "reason": "No API port assigned"}
+            return None
+        return f"http://localhost:{api_port}{service.capability.health_check_path}"
 
-        health_url = (
-            f"http://localhost:{api_port}{service.capability.health_check_path}"
-        )
+    async def _probe_health(
+        self, url: str, timeout: float
+    ) -> tuple[Optional[int], Optional[str], bool]:
+        """GET a health URL on the shared client.
 
+        Returns the status code (None if no response arrived), a failure reason,
+        and whether a connection was established.
+        """
         try:
-            async with httpx.AsyncClient() as client:
-                start = asyncio.get_event_loop().time()
-                response = await client.get(
-                    health_url, timeout=self.config.health_check.timeout_seconds
-                )
-                response_time = (asyncio.get_event_loop().time() - start) * 1000
-
-                if response.status_code == 200:
-                    service.health_status = "healthy"
-                    service.last_health_check = datetime.now()
-                    return {
-                        "status": "healthy",
-                        "response_time_ms": round(response_time, 2),
-                    }
-                else:
-                    service.health_status = "unhealthy"
-                    return {
-                        "status": "unhealthy",
-                        "reason": f"HTTP {response.status_code}",
-                    }
+            response = await self.http_client.get(url, timeout=timeout)
+        except httpx.ConnectTimeout:
+            return None, "timeout", False
         except httpx.TimeoutException:
-            service.health_status = "unhealthy"
-            return {"status": "unhealthy", "reason": "timeout"}
+            return None, "timeout", True
         except httpx.ConnectError:
-            service.health_status = "unhealthy"
-            return {"status": "unhealthy", "reason": "connection refused"}
-        except Exception as e:
-            service.health_status = "error"
-            return {"status": "error", "reason": str(e)}
+            return None, "connection refused", False
+        return response.status_code, None, True
 
     def get_service_logs(self, service_id: str, lines: int = 100) -> list[str]:
         service = self.discovery.get_service(service_id)
         if not service:
             return []
-        return service.logs[-lines:]
+        logs = service.logs
+        return list(islice(logs, max(0, len(logs) - lines), None))
 
     def get_port_conflicts(self) -> dict[int, list[str]]:
         conflicts: dict[int, list[str]] = {}
@@ -343,23 +530,7 @@ class ServiceManager:
         if not service.capability:
             return {}
 
-        env_path = service.path / ".env"
-        env_vars = {}
-
-        if env_path.exists():
-            try:
-                content = env_path.read_text(encoding='utf-8')
-                for line in content.splitlines():
-                    line = line.strip()
-                    if not line or line.startswith("#"):
-                        continue
-                    if "=" in line:
-                        key, _, value = line.partition("=")
-                        key = key.strip()
-                        value = value.strip().strip('"').strip("'")
-                        env_vars[key] = value
-            except Exception:
-                pass
+        env_vars = read_env_vars(service.path / ".env")
 
         configured_ports = {}
         for port_key, port_config in service.capability.ports.items():
@@ -377,8 +548,17 @@ class ServiceManager:
         return configured_ports
 
     def get_next_available_port(
-        self, port_type: str, exclude: Optional[set[int]] = None
+        self,
+        port_type: str,
+        exclude: Optional[set[int]] = None,
+        start: Optional[int] = None,
     ) -> int:
+        """Find a free port of ``port_type`` outside ``exclude``.
+
+        With ``start`` the scan begins there and does not wrap; callers use it to
+        skip ports already rejected in the same pass. Without it the scan resumes
+        after the last port handed out for that type and wraps to the range start.
+        """
         exclude = exclude or set()
         ranges = self.config.port_ranges
 
@@ -389,10 +569,20 @@ class ServiceManager:
         else:
             port_min, port_max = 8000, 9000
 
-        for port in range(port_min, port_max + 1):
+        if start is not None:
+            candidates = range(max(port_min, start), port_max + 1)
+        else:
+            hint = self._next_free.get(port_type, port_min)
+            if not port_min <= hint <= port_max:
+                hint = port_min
+            candidates = chain(range(hint, port_max + 1), range(port_min, hint))
+
+        for port in candidates:
             if port in exclude:
                 continue
             if not is_port_in_use(port):
+                if start is None:
+                    self._next_free[port_type] = port + 1
                 return port
 
         raise RuntimeError(
@@ -402,7 +592,11 @@ class ServiceManager:
     def assign_non_conflicting_ports(self) -> dict[str, dict[str, int]]:
         services = self.discovery.get_all_services()
         assignments: dict[str, dict[str, int]] = {}
-        used_ports: set[int] = set()
+        # Known listeners are excluded up front so only free-looking ports are
+        # confirmed with a bind() probe.
+        used_ports: set[int] = snapshot_listening_ports()
+        # Ports below a type's cursor were already rejected earlier in this pass.
+        scan_cursor: dict[str, int] = {}
 
         for service in services:
             if not service.capability:
@@ -416,9 +610,15 @@ class ServiceManager:
                     service_ports[port_key] = default_port
                     used_ports.add(default_port)
                 else:
-                    new_port = self.get_next_available_port(port_key, used_ports)
+                    # A busy default stays excluded, so services sharing it
+                    # do not bind-probe it again.
+                    used_ports.add(default_port)
+                    new_port = self.get_next_available_port(
+                        port_key, used_ports, scan_cursor.get(port_key)
+                    )
                     service_ports[port_key] = new_port
                     used_ports.add(new_port)
+                    scan_cursor[port_key] = new_port + 1
                     logger.info(
                         f"Reassigned {service.id}:{port_key} from {default_port} to {new_port}"
                     )
@@ -435,9 +635,11 @@ class ServiceManager:
         running_services = [
             s for s in self.discovery.get_all_services() if s.is_running
         ]
-        used_ports: set[int] = set()
+        used_ports: set[int] = snapshot_listening_ports()
         for s in running_services:
             used_ports.update(s.assigned_ports.values())
+        for reserved in self._reserved_ports.values():
+            used_ports.update(reserved.values())
 
         port_assignments = {}
         for port_key, port_config in service.capability.ports.items():
@@ -446,6 +648,7 @@ class ServiceManager:
                 if default_port not in used_ports and not is_port_in_use(default_port):
                     port_assignments[port_key] = default_port
                 else:
+                    used_ports.add(default_port)
                     new_port = self.get_next_available_port(port_key, used_ports)
                     port_assignments[port_key] = new_port
                     logger.info(
@@ -459,7 +662,13 @@ class ServiceManager:
                 )
             used_ports.add(port_assignments[port_key])
 
-        return await self.start_service(service_id, port_assignments)
+        # Nothing above awaits, so the pick and the reservation are atomic with
+        # respect to other auto-port starts on the loop.
+        self._reserved_ports[service_id] = port_assignments
+        try:
+            return await self.start_service(service_id, port_assignments)
+        finally:
+            self._reserved_ports.pop(service_id, None)
 
     def _is_port_in_machine_range(self, port: int, port_type: str) -> bool:
         if port_type == "api":
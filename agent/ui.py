@@ -1,57 +1,120 @@
 import asyncio
+import functools
 import logging
+import time
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 import gradio as gr
-import yaml
 
 from agent.config import MACHINE_INFO, MACHINE_PORT_RANGES, generate_machine_config
+from agent.models import ServiceStatus
 
 if TYPE_CHECKING:
     pass
 
 logger = logging.getLogger("agent.ui")
 
+# The resources tab refreshes every RESOURCES_POLL_MIN_SECONDS while it is open,
+# doubling up to RESOURCES_POLL_MAX_SECONDS while CPU and RAM stay within these
+# percentage-point deltas of the previous sample.
+RESOURCES_POLL_MIN_SECONDS = 5.0
+RESOURCES_POLL_MAX_SECONDS = 60.0
+RESOURCES_STABLE_CPU_DELTA = 2.0
+RESOURCES_STABLE_RAM_DELTA = 1.0
+
+# Status bar entries; running services with a UI port link to it.
+_STATUS_STYLE = "margin-right:12px; font-size:13px;"
+_STATUS_LINK = (
+    '<a href="http://localhost:{port}" target="_blank" '
+    f'style="color:#22c55e; {_STATUS_STYLE} text-decoration:none;">● {{name}}</a>'
+)
+_STATUS_RUNNING = f'<span style="color:#22c55e; {_STATUS_STYLE}">● {{name}}</span>'
+_STATUS_FAILED = f'<span style="color:#ef4444; {_STATUS_STYLE}">● {{name}}</span>'
+_STATUS_IDLE = f'<span style="color:#6b7280; {_STATUS_STYLE}">○ {{name}}</span>'
+
+
+@functools.lru_cache(maxsize=512)
+def _short_name(service_id: str) -> str:
+    return service_id.replace("11_", "").replace("_", " ").title()[:15]
+
+
+# Usage bars for the resources tab, one per 5% step.
+_BARS = tuple("█" * i + "░" * (20 - i) for i in range(21))
+
+
+def _make_bar(pct: float) -> str:
+    return _BARS[max(0, min(20, int(pct / 5)))]
+
+
+# Services launched at once by "Start All".
+START_ALL_CONCURRENCY = 4
+
+# Minimum gap between UI updates while a capability reply is streaming in.
+CAPABILITY_STREAM_UPDATE_SECONDS = 0.25
+
+# Repeat selections of a service within this window reuse the last details
+# panel, unless discovery state changed in between.
+SERVICE_INFO_DEBOUNCE_SECONDS = 0.15
+
 
 def create_gradio_ui(agent) -> gr.Blocks:
     def get_services_list():
         services = agent.discovery.get_all_services()
         return [s.id for s in services]
 
-    def get_services_status_html():
-        services = agent.discovery.get_all_services()
+    # (discovery.version, html) of the last status bar render.
+    status_html_cache = (-1, "")
+
+    def services_snapshot():
+        # The version is read first, so a change landing in between is never
+        # cached under the newer version; it just causes one more render.
+        version = agent.discovery.version
+        return version, agent.discovery.get_all_services()
+
+    def get_services_status_html(snapshot=None):
+        nonlocal status_html_cache
+        version, services = snapshot or services_snapshot()
+        if status_html_cache[0] == version:
+            return status_html_cache[1]
+
         items = []
         for s in services:
-            short_name = s.id.replace("11_", "").replace("_", " ").title()[:15]
+            name = _short_name(s.id)
             if s.is_running:
-                color = "#22c55e"
-                icon = "●"
                 ui_port = s.assigned_ports.get("ui")
                 if ui_port:
-                    ui_url = f"http://localhost:{ui_port}"
-                    items.append(
-                        f'<a href="{ui_url}" target="_blank" style="color:{color}; margin-right:12px; font-size:13px; text-decoration:none;">{icon} {short_name}</a>'
-                    )
+                    items.append(_STATUS_LINK.format(port=ui_port, name=name))
                 else:
-                    items.append(
-                        f'<span style="color:{color}; margin-right:12px; font-size:13px;">{icon} {short_name}</span>'
-                    )
-            elif s.status.value == "failed":
-                color = "#ef4444"
-                icon = "●"
-                items.append(
-                    f'<span style="color:{color}; margin-right:12px; font-size:13px;">{icon} {short_name}</span>'
-                )
+                    items.append(_STATUS_RUNNING.format(name=name))
+            elif s.status == ServiceStatus.FAILED:
+                items.append(_STATUS_FAILED.format(name=name))
             else:
-                color = "#6b7280"
-                icon = "○"
-                items.append(
-                    f'<span style="color:{color}; margin-right:12px; font-size:13px;">{icon} {short_name}</span>'
-                )
-        return "".join(items)
-
-    def get_service_info(service_id: str):
+                items.append(_STATUS_IDLE.format(name=name))
+        html = "".join(items)
+        status_html_cache = (version, html)
+        return html
+
+    def choices_update(shown_ids, services):
+        ids = tuple(s.id for s in services)
+        if ids == shown_ids:
+            return shown_ids, gr.update()
+        return ids, gr.update(choices=list(ids))
+
+    async def watch_services_status():
+        changes = agent.discovery.subscribe()
+        shown_ids = None
+        try:
+            while True:
+                # One snapshot for both outputs, so they agree with each other.
+                snapshot = services_snapshot()
+                shown_ids, choices = choices_update(shown_ids, snapshot[1])
+                yield get_services_status_html(snapshot), choices, choices
+                await changes.get()
+        finally:
+            agent.discovery.unsubscribe(changes)
+
+    def render_service_info(service_id: str):
         if not service_id:
             return "Select a service to view details", "", "ready"
 
@@ -111,43 +174,63 @@ def create_gradio_ui(agent) -> gr.Blocks:
         if service.error:
             info += f"\n**Error:** {service.error}"
 
-        cap_yaml = ""
-        if service.capability and service.capability.raw_yaml:
-            cap_yaml = yaml.dump(
-                service.capability.raw_yaml, default_flow_style=False, sort_keys=False
-            )
+        cap_yaml = service.capability.rendered_yaml() if service.capability else ""
 
         return info, cap_yaml, service.status.value
 
-    def get_folders_list():
-        return [[f] for f in agent.config.service_folders]
+    # service_id -> (monotonic time, discovery.version, panel) of the last render.
+    service_info_cache: dict[str, tuple[float, int, tuple]] = {}
+
+    async def get_service_info(service_id: str):
+        now = time.monotonic()
+        version = agent.discovery.version
+        cached = service_info_cache.get(service_id)
+        if (
+            cached is not None
+            and cached[1] == version
+            and now - cached[0] < SERVICE_INFO_DEBOUNCE_SECONDS
+        ):
+            return cached[2]
+        info = await asyncio.to_thread(render_service_info, service_id)
+        service_info_cache[service_id] = (now, version, info)
+        return info
+
+    # (tuple(service_folders), rows) of the last folders table.
+    folders_cache: tuple[tuple[str, ...], list[list[str]]] = ((), [])
 
-    def add_folder(folder_path: str):
+    async def get_folders_list():
+        nonlocal folders_cache
+        folders = tuple(agent.config.service_folders)
+        if folders != folders_cache[0]:
+            folders_cache = (folders, [[f] for f in folders])
+        return folders_cache[1]
+
+    async def add_folder(folder_path: str):
         if not folder_path or not folder_path.strip():
-            return get_folders_list(), "⚠️ Please enter a folder path"
+            return await get_folders_list(), "⚠️ Please enter a folder path"
 
         folder_path = folder_path.strip()
         path = Path(folder_path).expanduser().resolve()
 
         if not path.exists():
-            return get_folders_list(), f"❌ Folder does not exist: {path}"
+            return await get_folders_list(), f"❌ Folder does not exist: {path}"
 
         if not path.is_dir():
-            return get_folders_list(), f"❌ Not a directory: {path}"
+            return await get_folders_list(), f"❌ Not a directory: {path}"
 
         str_path = str(path)
         if str_path in agent.config.service_folders:
-            return get_folders_list(), f"⚠️ Folder already added: {path}"
+            return await get_folders_list(), f"⚠️ Folder already added: {path}"
 
         agent.config.service_folders.append(str_path)
-        agent.config.save_config()
-        agent.discovery.scan()
+        await asyncio.to_thread(agent.config.save_config)
+        await asyncio.to_thread(agent.discovery.scan_folder, str_path)
 
-        return get_folders_list(), f"✅ Added: {path}"
+        return await get_folders_list(), f"✅ Added: {path}"
 
-    def remove_folder(folder_data):
+    async def remove_folder(folder_data):
         if not folder_data or len(folder_data) == 0:
-            return get_folders_list(), "⚠️ Select a folder to remove"
+            return await get_folders_list(), "⚠️ Select a folder to remove"
 
         try:
             if isinstance(folder_data, list) and len(folder_data) > 0:
@@ -156,69 +239,48 @@ def create_gradio_ui(agent) -> gr.Blocks:
                 else:
                     folder_path = folder_data[0]
             else:
-                return get_folders_list(), "⚠️ Invalid selection"
+                return await get_folders_list(), "⚠️ Invalid selection"
 
             if folder_path in agent.config.service_folders:
                 agent.config.service_folders.remove(folder_path)
-                agent.config.save_config()
-                agent.discovery.scan()
-                return get_folders_list(), f"✅ Removed: {folder_path}"
+                await asyncio.to_thread(agent.config.save_config)
+                agent.discovery.forget_folder(folder_path)
+                return await get_folders_list(), f"✅ Removed: {folder_path}"
             else:
-                return get_folders_list(), f"⚠️ Folder not in list: {folder_path}"
+                return (
+                    await get_folders_list(),
+                    f"⚠️ Folder not in list: {folder_path}",
+                )
         except Exception as e:
-            return get_folders_list(), f"❌ Error: {e}"
+            return await get_folders_list(), f"❌ Error: {e}"
 
-    def scan_all_folders():
-        services = agent.discovery.scan()
-        return gr.update(
-            choices=get_services_list()
-        ), f"✅ Found {len(services)} services"
+    async def scan_all_folders():
+        services = await asyncio.to_thread(agent.discovery.scan)
+        return f"✅ Found {len(services)} services"
 
     async def start_service(service_id: str):
         if not service_id:
-            return (
-                "⚠️ Select a service first",
-                gr.update(choices=get_services_list()),
-                get_services_status_html(),
-            )
+            return "⚠️ Select a service first", get_services_status_html()
         try:
             await agent.service_manager.start_service(service_id)
-            return (
-                f"✅ Started {service_id}",
-                gr.update(choices=get_services_list()),
-                get_services_status_html(),
-            )
+            return f"✅ Started {service_id}", get_services_status_html()
         except Exception as e:
-            return (
-                f"❌ Error: {e}",
-                gr.update(choices=get_services_list()),
-                get_services_status_html(),
-            )
+            return f"❌ Error: {e}", get_services_status_html()
 
     async def start_service_auto(service_id: str):
         if not service_id:
-            return (
-                "⚠️ Select a service first",
-                gr.update(choices=get_services_list()),
-                get_services_status_html(),
-            )
+            return "⚠️ Select a service first", get_services_status_html()
         try:
             service = await agent.service_manager.start_service_auto_ports(service_id)
             ports_str = ", ".join(f"{k}={v}" for k, v in service.assigned_ports.items())
             return (
                 f"✅ Started {service_id} on ports: {ports_str}",
-                gr.update(choices=get_services_list()),
                 get_services_status_html(),
             )
         except Exception as e:
-            return (
-                f"❌ Error: {e}",
-                gr.update(choices=get_services_list()),
-                get_services_status_html(),
-            )
+            return f"❌ Error: {e}", get_services_status_html()
 
-    def get_port_conflicts_info():
-        conflicts = agent.port_configurator.get_configured_port_conflicts()
+    def render_port_conflicts(conflicts):
         if not conflicts:
             return "✅ No port conflicts detected"
 
@@ -228,13 +290,24 @@ def create_gradio_ui(agent) -> gr.Blocks:
         lines.append("\n*Click 'Fix Port Conflicts' to permanently update .env files*")
         return "\n".join(lines)
 
-    def fix_port_conflicts():
-        conflicts = agent.port_configurator.get_configured_port_conflicts()
+    async def get_port_conflicts_info():
+        # Stats and reads every service's .env, so keep it off the event loop.
+        conflicts = await asyncio.to_thread(
+            agent.port_configurator.get_configured_port_conflicts
+        )
+        return render_port_conflicts(conflicts)
+
+    async def fix_port_conflicts():
+        conflicts = await asyncio.to_thread(
+            agent.port_configurator.get_configured_port_conflicts
+        )
         if not conflicts:
-            return "✅ No port conflicts to fix", get_port_conflicts_info()
+            return "✅ No port conflicts to fix", render_port_conflicts(conflicts)
 
         try:
-            results = agent.port_configurator.resolve_all_conflicts()
+            results = await asyncio.to_thread(
+                agent.port_configurator.resolve_all_conflicts
+            )
 
             changes = []
             for service_id, result in results.items():
@@ -251,9 +324,9 @@ def create_gradio_ui(agent) -> gr.Blocks:
             else:
                 msg = "✅ No changes needed"
 
-            return msg, get_port_conflicts_info()
+            return msg, await get_port_conflicts_info()
         except Exception as e:
-            return f"❌ Error: {e}", get_port_conflicts_info()
+            return f"❌ Error: {e}", await get_port_conflicts_info()
 
     def sync_all_readmes():
         try:
@@ -279,40 +352,51 @@ def create_gradio_ui(agent) -> gr.Blocks:
 
     async def stop_service(service_id: str):
         if not service_id:
-            return (
-                "⚠️ Select a service first",
-                gr.update(choices=get_services_list()),
-                get_services_status_html(),
-            )
+            return "⚠️ Select a service first", get_services_status_html()
         try:
             await agent.service_manager.stop_service(service_id)
-            return (
-                f"✅ Stopped {service_id}",
-                gr.update(choices=get_services_list()),
-                get_services_status_html(),
-            )
+            return f"✅ Stopped {service_id}", get_services_status_html()
         except Exception as e:
-            return (
-                f"❌ Error: {e}",
-                gr.update(choices=get_services_list()),
-                get_services_status_html(),
-            )
+            return f"❌ Error: {e}", get_services_status_html()
+
+    def needs_resources(service) -> bool:
+        cap = service.capability
+        return bool(cap.gpu_required or cap.min_vram_gb or cap.min_ram_gb)
 
     async def start_all_services():
-        services = agent.discovery.get_all_services()
-        started = []
-        failed = []
-        for service in services:
-            if service.is_running:
-                continue
-            if not service.has_capability:
-                continue
+        eligible = [
+            s
+            for s in agent.discovery.get_all_services()
+            if not s.is_running and s.has_capability
+        ]
+        gated = [s for s in eligible if needs_resources(s)]
+        sem = asyncio.Semaphore(START_ALL_CONCURRENCY)
+        errors: dict[str, Exception] = {}
+
+        async def start_one(service):
             try:
                 await agent.service_manager.start_service_auto_ports(service.id)
-                started.append(service.id)
-                await asyncio.sleep(1)
             except Exception as e:
-                failed.append(f"{service.id}: {e}")
+                errors[service.id] = e
+
+        async def start_gated():
+            # The resource check only sees memory that is already in use, so
+            # services with requirements start one at a time, each after the
+            # previous one is ready, or they would all pass against the same
+            # free VRAM/RAM and then run out once their models load.
+            for service in gated:
+                await start_one(service)
+
+        async def start_free(service):
+            async with sem:
+                await start_one(service)
+
+        await asyncio.gather(
+            start_gated(),
+            *(start_free(s) for s in eligible if not needs_resources(s)),
+        )
+        started = [s.id for s in eligible if s.id not in errors]
+        failed = [f"{s.id}: {errors[s.id]}" for s in eligible if s.id in errors]
 
         msg = ""
         if started:
@@ -321,53 +405,79 @@ def create_gradio_ui(agent) -> gr.Blocks:
             msg += f"\n❌ Failed: {', '.join(failed)}"
         if not started and not failed:
             msg = "ℹ️ All services already running or no capability"
-        return msg, gr.update(choices=get_services_list()), get_services_status_html()
+        return msg, get_services_status_html()
 
     async def stop_all_services():
-        services = agent.discovery.get_all_services()
-        stopped = []
-        for service in services:
-            if not service.is_running:
-                continue
-            try:
-                await agent.service_manager.stop_service(service.id)
-                stopped.append(service.id)
-            except Exception as e:
-                pass
+        running = [s for s in agent.discovery.get_all_services() if s.is_running]
+        results = await asyncio.gather(
+            *(agent.service_manager.stop_service(s.id) for s in running),
+            return_exceptions=True,
+        )
+        stopped = [
+            s.id
+            for s, result in zip(running, results)
+            if not isinstance(result, Exception)
+        ]
 
         if stopped:
             msg = f"✅ Stopped: {', '.join(stopped)}"
         else:
             msg = "ℹ️ No running services"
-        return msg, gr.update(choices=get_services_list()), get_services_status_html()
+        return msg, get_services_status_html()
 
     async def generate_capability_streaming(service_id: str):
         if not service_id:
             yield "⚠️ Select a service first", ""
             return  # noqa: B901
 
-        from agent.capability_generator import CapabilityGenerator
-
         service = agent.discovery.get_service(service_id)
         if not service:
             yield f"❌ Service not found: {service_id}", ""
             return  # noqa: B901
 
-        try:
-            generator = CapabilityGenerator(agent.config)
+        events: asyncio.Queue = asyncio.Queue()
+        task = asyncio.ensure_future(
+            agent.capability_generator.generate_capability(
+                service.path,
+                force=True,
+                progress=lambda *event: events.put_nowait(event),
+            )
+        )
+        task.add_done_callback(lambda _: events.put_nowait(None))
 
+        try:
             yield f"🔍 Analyzing service folder: {service.path}", ""
-            yield f"📂 Building directory tree...", ""
-            yield f"📄 Gathering file contents...", ""
-            yield f"🤖 Sending to Gemini 3 Flash Preview...", ""
-            yield f"⏳ Waiting for LLM response (this may take 10-30 seconds)...", ""
 
-            capability_yaml = await generator.generate_capability(service.path)
+            reply: list[str] = []
+            reply_chars = 0
+            last_update = 0.0
+            while (event := await events.get()) is not None:
+                stage, payload = event
+                if stage == "prompt_ready":
+                    yield f"📄 Read {payload:,} characters of service context", ""
+                elif stage == "requesting":
+                    reply.clear()
+                    reply_chars = 0
+                    yield f"🤖 Waiting for {payload}...", ""
+                elif stage == "chunk":
+                    reply.append(payload)
+                    reply_chars += len(payload)
+                    now = time.monotonic()
+                    if now - last_update >= CAPABILITY_STREAM_UPDATE_SECONDS:
+                        last_update = now
+                        yield (
+                            f"⏳ Receiving CAPABILITY.yaml ({reply_chars:,} chars)...",
+                            "".join(reply),
+                        )
 
-            cap_path = Path(service.path) / "CAPABILITY.yaml"
-            cap_path.write_text(capability_yaml, encoding='utf-8')
+            capability_yaml, data = task.result()
 
-            agent.discovery.update_service_capability(service_id, capability_yaml)
+            await asyncio.to_thread(
+                agent.discovery.update_service_capability,
+                service_id,
+                capability_yaml,
+                data,
+            )
 
             yield (
                 f"✅ Generated and saved CAPABILITY.yaml for {service_id}",
@@ -376,18 +486,15 @@ def create_gradio_ui(agent) -> gr.Blocks:
         except Exception as e:
             logger.exception(f"Error generating capability for {service_id}")
             yield f"❌ Error: {e}", ""
+        finally:
+            task.cancel()
 
-    def get_resources_info():
-        stats = agent.resource_monitor.get_all_stats()
+    def render_resources(stats: dict) -> str:
         gpu = stats.get("gpu", {})
         mem = stats.get("memory", {}).get("ram", {})
         cpu = stats.get("cpu", {})
         disk = stats.get("disk", {})
 
-        def make_bar(pct):
-            filled = int(pct / 5)
-            return "█" * filled + "░" * (20 - filled)
-
         ram_pct = mem.get("percent_used", 0)
         cpu_pct = cpu.get("percent", 0)
         disk_pct = disk.get("percent_used", 0)
@@ -395,15 +502,15 @@ def create_gradio_ui(agent) -> gr.Blocks:
         info = f"""## System Resources
 
 ### Memory
-`{make_bar(ram_pct)}` **{ram_pct:.1f}%**
+`{_make_bar(ram_pct)}` **{ram_pct:.1f}%**
 - Used: {mem.get("used_gb", 0):.1f} GB / {mem.get("total_gb", 0):.1f} GB
 
 ### CPU
-`{make_bar(cpu_pct)}` **{cpu_pct:.1f}%**
+`{_make_bar(cpu_pct)}` **{cpu_pct:.1f}%**
 - Cores: {cpu.get("cores", 0)} ({cpu.get("cores_physical", 0)} physical)
 
 ### Disk
-`{make_bar(disk_pct)}` **{disk_pct:.1f}%**
+`{_make_bar(disk_pct)}` **{disk_pct:.1f}%**
 - Used: {disk.get("used_gb", 0):.1f} GB / Free: {disk.get("free_gb", 0):.1f} GB
 """
 
@@ -414,20 +521,73 @@ def create_gradio_ui(agent) -> gr.Blocks:
                 vram_used = gpu.get("vram_used_gb", 0)
                 vram_total = gpu.get("vram_total_gb", 0)
                 vram_pct = (vram_used / vram_total * 100) if vram_total else 0
-                info += f"`{make_bar(vram_pct)}` **{vram_pct:.1f}%**\n"
+                info += f"`{_make_bar(vram_pct)}` **{vram_pct:.1f}%**\n"
                 info += f"- VRAM: {vram_used:.1f} / {vram_total:.1f} GB\n"
         else:
             info += f"\n### GPU\n*{gpu.get('reason', 'Not available')}*"
 
         return info
 
-    def get_logs(service_id: str):
+    async def get_resources_info():
+        return render_resources(agent.resource_monitor.latest_stats())
+
+    def resources_sample(stats: dict) -> tuple[float, float]:
+        return (
+            stats.get("cpu", {}).get("percent", 0),
+            stats.get("memory", {}).get("ram", {}).get("percent_used", 0),
+        )
+
+    async def poll_resources(interval: float, last_sample):
+        stats = await asyncio.to_thread(agent.resource_monitor.refresh_stats)
+        sample = resources_sample(stats)
+        if (
+            last_sample is not None
+            and abs(sample[0] - last_sample[0]) < RESOURCES_STABLE_CPU_DELTA
+            and abs(sample[1] - last_sample[1]) < RESOURCES_STABLE_RAM_DELTA
+        ):
+            interval = min(interval * 2, RESOURCES_POLL_MAX_SECONDS)
+        else:
+            interval = RESOURCES_POLL_MIN_SECONDS
+        return render_resources(stats), gr.Timer(value=interval), sample
+
+    async def on_resources_tab(evt: gr.SelectData):
+        if not evt.selected:
+            return gr.update(), gr.Timer(active=False), None
+        stats = await asyncio.to_thread(agent.resource_monitor.refresh_stats)
+        return (
+            render_resources(stats),
+            gr.Timer(value=RESOURCES_POLL_MIN_SECONDS, active=True),
+            resources_sample(stats),
+        )
+
+    async def on_other_tab():
+        return gr.Timer(active=False)
+
+    async def get_logs(service_id: str):
         if not service_id:
             return "Select a service to view logs"
         logs = agent.service_manager.get_service_logs(service_id, lines=100)
         return "\n".join(logs) if logs else "No logs available"
 
-    def get_config_info():
+    # Panel name -> (config.version, markdown) of the last render.
+    config_render_cache: dict[str, tuple[int, str]] = {}
+
+    def cached_config_render(name: str, render) -> str:
+        version = agent.config.version
+        cached = config_render_cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        text = render()
+        config_render_cache[name] = (version, text)
+        return text
+
+    async def get_config_info():
+        return cached_config_render("config", render_config_info)
+
+    async def get_machine_info():
+        return cached_config_render("machine", render_machine_info)
+
+    def render_config_info():
         cfg = agent.config
         api_key = cfg.get_llm_api_key()
         api_status = (
@@ -463,7 +623,7 @@ def create_gradio_ui(agent) -> gr.Blocks:
 | RAM | {cfg.resources.ram_reserve_gb} GB |
 """
 
-    def get_machine_info():
+    def render_machine_info():
         cfg = agent.config
 
         platform_ranges = MACHINE_PORT_RANGES.get(cfg.platform, {})
@@ -556,7 +716,7 @@ def create_gradio_ui(agent) -> gr.Blocks:
 
         with gr.Row():
             with gr.Column(scale=3):
-                services_status_html = gr.HTML(value=get_services_status_html, every=5)
+                services_status_html = gr.HTML()
             with gr.Column(scale=1):
                 with gr.Row():
                     start_all_btn = gr.Button(
@@ -565,7 +725,7 @@ def create_gradio_ui(agent) -> gr.Blocks:
                     stop_all_btn = gr.Button("⏹⏹ Stop All", variant="stop", size="sm")
 
         with gr.Tabs():
-            with gr.TabItem("🔧 Services", id="services"):
+            with gr.TabItem("🔧 Services", id="services") as services_tab:
                 with gr.Row():
                     with gr.Column(scale=1):
                         gr.Markdown("### Discovered Services")
@@ -588,7 +748,7 @@ def create_gradio_ui(agent) -> gr.Blocks:
                         scan_btn = gr.Button(
                             "🔄 Rescan All Folders", variant="secondary"
                         )
-                        port_conflicts_md = gr.Markdown(value=get_port_conflicts_info)
+                        port_conflicts_md = gr.Markdown()
                         with gr.Row():
                             fix_ports_btn = gr.Button(
                                 "🔧 Fix Port Conflicts", variant="secondary", size="sm"
@@ -602,7 +762,7 @@ def create_gradio_ui(agent) -> gr.Blocks:
 
                     with gr.Column(scale=2):
                         initial_info, initial_yaml, initial_status = (
-                            get_service_info(services[0])
+                            render_service_info(services[0])
                             if services
                             else ("Select a service to view details", "", "ready")
                         )
@@ -634,29 +794,29 @@ def create_gradio_ui(agent) -> gr.Blocks:
                     inputs=[service_dropdown],
                     outputs=[service_info, capability_yaml, service_status],
                 )
-                scan_btn.click(scan_all_folders, outputs=[service_dropdown, status_msg])
+                scan_btn.click(scan_all_folders, outputs=[status_msg])
                 start_btn.click(
                     start_service,
                     inputs=[service_dropdown],
-                    outputs=[status_msg, service_dropdown, services_status_html],
+                    outputs=[status_msg, services_status_html],
                 )
                 start_auto_btn.click(
                     start_service_auto,
                     inputs=[service_dropdown],
-                    outputs=[status_msg, service_dropdown, services_status_html],
+                    outputs=[status_msg, services_status_html],
                 )
                 stop_btn.click(
                     stop_service,
                     inputs=[service_dropdown],
-                    outputs=[status_msg, service_dropdown, services_status_html],
+                    outputs=[status_msg, services_status_html],
                 )
                 start_all_btn.click(
                     start_all_services,
-                    outputs=[status_msg, service_dropdown, services_status_html],
+                    outputs=[status_msg, services_status_html],
                 )
                 stop_all_btn.click(
                     stop_all_services,
-                    outputs=[status_msg, service_dropdown, services_status_html],
+                    outputs=[status_msg, services_status_html],
                 )
                 fix_ports_btn.click(
                     fix_port_conflicts,
@@ -672,7 +832,7 @@ def create_gradio_ui(agent) -> gr.Blocks:
                     outputs=[gen_status, capability_yaml],
                 )
 
-            with gr.TabItem("📁 Folders", id="folders"):
+            with gr.TabItem("📁 Folders", id="folders") as folders_tab:
                 gr.Markdown("### Service Folder Management")
                 gr.Markdown(
                     "Add folders containing services. Services will be discovered automatically on rescan."
@@ -681,7 +841,6 @@ def create_gradio_ui(agent) -> gr.Blocks:
                 folders_table = gr.Dataframe(
                     headers=["Folder Path"],
                     datatype=["str"],
-                    value=get_folders_list,
                     interactive=True,
                     wrap=True,
                     elem_classes=["folder-table"],
@@ -715,16 +874,29 @@ def create_gradio_ui(agent) -> gr.Blocks:
                     outputs=[folders_table, folder_status],
                 )
 
-            with gr.TabItem("📊 Resources", id="resources"):
-                resources_md = gr.Markdown(value=get_resources_info, every=10)
+            with gr.TabItem("📊 Resources", id="resources") as resources_tab:
+                resources_md = gr.Markdown()
+                # Only ticks while this tab is open; see poll_resources.
+                resources_timer = gr.Timer(RESOURCES_POLL_MIN_SECONDS, active=False)
+                last_resources_sample = gr.State(None)
+                resources_timer.tick(
+                    poll_resources,
+                    inputs=[resources_timer, last_resources_sample],
+                    outputs=[resources_md, resources_timer, last_resources_sample],
+                    show_progress="hidden",
+                )
+                resources_tab.select(
+                    on_resources_tab,
+                    outputs=[resources_md, resources_timer, last_resources_sample],
+                )
                 gr.Button("🔄 Refresh").click(
                     get_resources_info, outputs=[resources_md]
                 )
 
-            with gr.TabItem("📋 Logs", id="logs"):
+            with gr.TabItem("📋 Logs", id="logs") as logs_tab:
                 log_service = gr.Dropdown(
                     label="Select Service",
-                    choices=get_services_list(),
+                    choices=services,
                     interactive=True,
                 )
                 logs_display = gr.Code(
@@ -737,15 +909,15 @@ def create_gradio_ui(agent) -> gr.Blocks:
                     get_logs, inputs=[log_service], outputs=[logs_display]
                 )
 
-            with gr.TabItem("⚙️ Config", id="config"):
+            with gr.TabItem("⚙️ Config", id="config") as config_tab:
                 with gr.Row():
                     with gr.Column(scale=1):
-                        config_md = gr.Markdown(value=get_config_info)
+                        config_md = gr.Markdown()
                         gr.Button("🔄 Refresh Config").click(
                             get_config_info, outputs=[config_md]
                         )
                     with gr.Column(scale=1):
-                        machine_info_md = gr.Markdown(value=get_machine_info)
+                        machine_info_md = gr.Markdown()
                         gr.Button("🔄 Refresh Machine Info").click(
                             get_machine_info, outputs=[machine_info_md]
                         )
@@ -763,4 +935,27 @@ def create_gradio_ui(agent) -> gr.Blocks:
                     do_generate_machine_config, outputs=[gen_config_status]
                 )
 
+        # The async renderers can't be passed as component values, which Gradio
+        # evaluates synchronously while building, so fill them in on page load.
+        gr.on(
+            [tab.select for tab in (services_tab, folders_tab, logs_tab, config_tab)],
+            on_other_tab,
+            outputs=[resources_timer],
+        )
+
+        app.load(get_port_conflicts_info, outputs=[port_conflicts_md])
+        # One long-lived stream per page that pushes the status bar and, when the
+        # set of services changed, the dropdown choices whenever discovery
+        # changes; it must not count against the default limit of 1.
+        app.load(
+            watch_services_status,
+            outputs=[services_status_html, service_dropdown, log_service],
+            concurrency_limit=None,
+            show_progress="hidden",
+        )
+        app.load(get_folders_list, outputs=[folders_table])
+        app.load(get_resources_info, outputs=[resources_md])
+        app.load(get_config_info, outputs=[config_md])
+        app.load(get_machine_info, outputs=[machine_info_md])
+
     return app
@@ -9,11 +9,15 @@ from contextlib import asynccontextmanager
 from pathlib import Path
 
 import gradio as gr
+import httpx
 import uvicorn
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 
+from agent._yaml import HAS_LIBYAML
 from agent.config import load_config, AgentConfig, CURRENT_PLATFORM
 from agent.api import create_api_router
+from agent.capability_generator import CapabilityGenerator
 from agent.ui import create_gradio_ui
 from agent.service_manager import ServiceManager
 from agent.discovery import ServiceDiscovery
@@ -59,9 +63,18 @@ class ServiceAgent:
         self.config = config
         self.discovery = ServiceDiscovery(config)
         self.resource_monitor = ResourceMonitor(config)
+        self.http_client = httpx.AsyncClient(
+            timeout=config.health_check.timeout_seconds,
+            limits=httpx.Limits(
+                max_keepalive_connections=32,
+                max_connections=100,
+                keepalive_expiry=15.0,
+            ),
+        )
         self.service_manager = ServiceManager(
-            config, self.discovery, self.resource_monitor
+            config, self.discovery, self.resource_monitor, self.http_client
         )
+        self.capability_generator = CapabilityGenerator(config)
         self.port_configurator = PortConfigurator(
             self.discovery,
             {
@@ -75,6 +88,14 @@ class ServiceAgent:
     async def startup(self):
         logger.info(f"Starting White Mirror Service Agent v1.0.0")
         logger.info(f"Machine ID: {self.config.machine_id}")
+        if not HAS_LIBYAML:
+            logger.info(
+                "libyaml bindings not available; using the pure-Python YAML "
+                "loader. Install libyaml and reinstall PyYAML for faster "
+                "capability parsing."
+            )
+        self.capability_generator.warm_up()
+        await asyncio.to_thread(self.resource_monitor.refresh_stats)
 
         for service_id in self.config.always_running:
             service = self.discovery.get_service(service_id)
@@ -90,6 +111,7 @@ class ServiceAgent:
     async def shutdown(self):
         logger.info("Shutting down Service Agent...")
         await self.service_manager.stop_all_services()
+        await self.http_client.aclose()
         logger.info("Service Agent stopped")
 
 
@@ -138,6 +160,8 @@ def create_app(config: AgentConfig) -> FastAPI:
     app.state.agent = agent
     app.state.config = config
 
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
+
     api_router = create_api_router(agent)
     app.include_router(api_router)
 
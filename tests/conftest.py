@@ -167,6 +167,7 @@ def resource_monitor():
         "gpu": None,
         "disk": {"total_gb": 500.0, "free_gb": 250.0, "usage_percent": 50.0},
     }
+    monitor.latest_stats.return_value = monitor.get_all_stats.return_value
     monitor.check_resources_available.return_value = (True, None)
     return monitor
 
@@ -215,6 +216,7 @@ def mock_agent(agent_config, discovery, resource_monitor):
     # Use a mock for service_manager to allow setting return_value on methods
     mock_service_manager = MagicMock()
     mock_service_manager.get_service_logs.return_value = []
+    mock_service_manager._get_configured_ports.return_value = {}
     agent.service_manager = mock_service_manager
     return agent
 
@@ -1,8 +1,15 @@
 """Unit tests for REST API endpoints."""
 
+import asyncio
+import inspect
+import time
+
+import orjson
 import pytest
+import yaml
 from unittest.mock import MagicMock, AsyncMock, patch
 from fastapi import FastAPI
+from fastapi.routing import APIRoute
 from fastapi.testclient import TestClient
 
 from agent.api import create_api_router
@@ -27,6 +34,18 @@ def client(app):
     return TestClient(app)
 
 
+class TestRouter:
+    """Tests for router-wide conventions."""
+
+    def test_all_handlers_are_async(self, mock_agent):
+        """Handlers must be coroutines so Starlette never offloads them to the threadpool."""
+        router = create_api_router(mock_agent)
+
+        for route in router.routes:
+            if isinstance(route, APIRoute):
+                assert inspect.iscoroutinefunction(route.endpoint), route.path
+
+
 class TestDiscoverEndpoint:
     """Tests for GET /discover endpoint."""
 
@@ -61,6 +80,37 @@ class TestDiscoverEndpoint:
         assert "ram" in data["resources"]
 
 
+class TestResponseCache:
+    """Tests for short-lived caching of polled read endpoints."""
+
+    def test_discover_served_from_cache(self, client, discovery):
+        """Repeated /discover calls within the TTL should reuse the payload."""
+        first = client.get("/discover").json()
+
+        discovery.get_service("test_service").error = "changed"
+        second = client.get("/discover").json()
+
+        assert second == first
+
+    def test_discover_cache_invalidated_on_change(self, client, discovery):
+        """Discovery state changes should invalidate cached responses."""
+        client.get("/discover")
+
+        discovery.get_service("test_service").error = "changed"
+        discovery.mark_changed()
+        data = client.get("/discover").json()
+
+        assert data["services"][0]["error"] == "changed"
+
+    def test_config_update_invalidates_cache(self, client):
+        """PUT /config should drop cached responses."""
+        client.get("/discover")
+        client.put("/config", json={"machine_name": "Renamed"})
+
+        data = client.get("/discover").json()
+        assert data["agent"]["machine_name"] == "Renamed"
+
+
 class TestStatusEndpoint:
     """Tests for GET /status endpoint."""
 
@@ -82,6 +132,53 @@ class TestStatusEndpoint:
         assert "services" in data
         assert data["services"]["total"] == 1
 
+    def test_status_counts_by_state(self, client, discovery):
+        """Status should bucket services into running/stopped/failed."""
+        data = client.get("/status").json()
+        assert data["services"]["stopped"] == 1
+        assert data["services"]["running"] == 0
+
+        discovery.get_service("test_service").status = ServiceStatus.FAILED
+        data = client.get("/status").json()
+        assert data["services"]["stopped"] == 0
+        assert data["services"]["failed"] == 1
+
+
+def _route_endpoint(router, path):
+    return next(route.endpoint for route in router.routes if route.path == path)
+
+
+class TestEventsEndpoint:
+    """Tests for the GET /events SSE stream."""
+
+    @pytest.mark.asyncio
+    async def test_rescan_pushes_complete_discover(self, mock_agent, discovery):
+        """A rescan on another thread should push a snapshot with every service."""
+        discovery.scan()
+        events = _route_endpoint(create_api_router(mock_agent), "/events")
+        request = MagicMock()
+        request.is_disconnected = AsyncMock(return_value=False)
+
+        response = await events(request)
+        stream = response.body_iterator
+        assert (await stream.__anext__()).startswith(b"event: discover\n")
+
+        create_service = discovery._create_service
+
+        def slow_create_service(*args):
+            time.sleep(0.05)
+            return create_service(*args)
+
+        pushed = asyncio.ensure_future(stream.__anext__())
+        with patch.object(discovery, "_create_service", slow_create_service):
+            await asyncio.to_thread(discovery.scan)
+        event = await asyncio.wait_for(pushed, timeout=1)
+        await stream.aclose()
+
+        assert event.startswith(b"event: discover\n")
+        data = orjson.loads(event.split(b"data: ", 1)[1])
+        assert [s["id"] for s in data["services"]] == ["test_service"]
+
 
 class TestServicesEndpoint:
     """Tests for /services endpoints."""
@@ -161,6 +258,48 @@ class TestServiceControlEndpoints:
         call_args = mock_agent.service_manager.start_service.call_args
         assert call_args.kwargs["port_assignments"] == {"api": 9000}
 
+    def test_start_service_without_body(self, client, mock_agent, sample_service):
+        """Start should treat a missing body as no port assignments."""
+        mock_agent.service_manager.start_service = AsyncMock(
+            return_value=Service(
+                id="test_service",
+                path=sample_service.path,
+                status=ServiceStatus.RUNNING,
+                capability=sample_service.capability,
+                pid=12345,
+                assigned_ports={"api": 8000},
+            )
+        )
+
+        response = client.post("/services/test_service/start")
+        assert response.status_code == 200
+
+        call_args = mock_agent.service_manager.start_service.call_args
+        assert call_args.kwargs["port_assignments"] is None
+
+    def test_start_service_rejects_non_object_body(self, client):
+        """Start should reject bodies that are not JSON objects."""
+        response = client.post("/services/test_service/start", content=b"[1, 2]")
+        assert response.status_code == 400
+
+    def test_start_service_rejects_mistyped_body(self, client, mock_agent):
+        """Start should answer 422 when a field has the wrong type."""
+        mock_agent.service_manager.start_service = AsyncMock()
+
+        response = client.post(
+            "/services/test_service/start", json={"port_assignments": "9000"}
+        )
+        assert response.status_code == 422
+        mock_agent.service_manager.start_service.assert_not_called()
+
+    def test_body_schemas_in_openapi(self, app):
+        """Routes reading the raw body should still document their schema."""
+        paths = app.openapi()["paths"]
+        body = paths["/services/{service_id}/start"]["post"]["requestBody"]
+        schema = body["content"]["application/json"]["schema"]
+        assert "port_assignments" in schema["properties"]
+        assert "requestBody" in paths["/config"]["put"]
+
     def test_start_service_error(self, client, mock_agent):
         """Start should return error on failure."""
         mock_agent.service_manager.start_service = AsyncMock(
@@ -301,6 +440,74 @@ class TestScanEndpoint:
         assert "services_found" in data
 
 
+class TestGenerateCapabilitiesEndpoint:
+    """Tests for POST /services/generate-capabilities endpoint."""
+
+    def test_generate_capabilities(self, client, mock_agent, discovery):
+        """Generated capabilities should be saved and reported per service."""
+        service = discovery.get_service("test_service")
+        capability_yaml = (service.path / "CAPABILITY.yaml").read_text()
+        generated = (capability_yaml, yaml.safe_load(capability_yaml))
+        mock_agent.capability_generator.generate_capabilities_batch = AsyncMock(
+            return_value={service.path: generated}
+        )
+
+        response = client.post(
+            "/services/generate-capabilities",
+            json={"service_ids": ["test_service"]},
+        )
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data == {"success": True, "generated": ["test_service"], "failed": []}
+        batch = mock_agent.capability_generator.generate_capabilities_batch
+        assert batch.call_args.kwargs["force"] is False
+
+    def test_generate_capabilities_force(self, client, mock_agent, discovery):
+        """A force flag in the body should be passed through to the generator."""
+        mock_agent.capability_generator.generate_capabilities_batch = AsyncMock(
+            return_value={}
+        )
+
+        client.post(
+            "/services/generate-capabilities",
+            json={"service_ids": ["test_service"], "force": True},
+        )
+
+        batch = mock_agent.capability_generator.generate_capabilities_batch
+        assert batch.call_args.kwargs["force"] is True
+
+    def test_generate_capabilities_unknown_service(self, client):
+        """Unknown service ids should return 404."""
+        response = client.post(
+            "/services/generate-capabilities",
+            json={"service_ids": ["nonexistent"]},
+        )
+        assert response.status_code == 404
+
+
+class TestPortAssignmentsEndpoint:
+    """Tests for GET /ports/assignments endpoint."""
+
+    def test_port_assignments(self, client, mock_agent):
+        """Assignments should report default, assigned and changed per port."""
+        mock_agent.service_manager.assign_non_conflicting_ports.return_value = {
+            "test_service": {"api": 8100},
+            "unknown_service": {"api": 8101},
+        }
+
+        response = client.get("/ports/assignments")
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["total_services"] == 1
+        assert data["assignments"][0]["ports"]["api"] == {
+            "default": 8000,
+            "assigned": 8100,
+            "changed": True,
+        }
+
+
 class TestResourcesEndpoint:
     """Tests for GET /resources endpoint."""
 
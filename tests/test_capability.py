@@ -1,12 +1,14 @@
 """Unit tests for CapabilityGenerator."""
 
 import tempfile
+import threading
 from pathlib import Path
 from unittest.mock import MagicMock, AsyncMock, patch
 
 import pytest
 
 from agent.capability_generator import (
+    CAPABILITY_PROMPT_STATIC,
     CapabilityGenerator,
     PRIORITY_FILES,
     SKIP_DIRS,
@@ -19,9 +21,9 @@ class TestCapabilityGenerator:
     """Tests for CapabilityGenerator class."""
 
     @pytest.fixture
-    def generator(self, agent_config):
+    def generator(self, agent_config, tmp_path):
         """Create CapabilityGenerator instance."""
-        return CapabilityGenerator(agent_config)
+        return CapabilityGenerator(agent_config, cache_dir=tmp_path / "cache")
 
     def test_build_directory_tree(self, generator, temp_dir):
         """Should build directory tree representation."""
@@ -108,6 +110,20 @@ class TestCapabilityGenerator:
 
         assert len(contents) <= MAX_TOTAL_CHARS + 1000  # Some buffer for formatting
 
+    def test_gather_file_contents_walks_nested_src(self, generator, temp_dir):
+        """Should include src python files below the tree depth, skipping SKIP_DIRS."""
+        deep = temp_dir / "src" / "a" / "b" / "c"
+        deep.mkdir(parents=True)
+        (deep / "handler.py").write_text("def handler():\n    pass\n" * 10)
+        cache = temp_dir / "src" / "__pycache__"
+        cache.mkdir()
+        (cache / "stale.py").write_text("x = 1\n" * 50)
+
+        contents = generator._gather_file_contents(temp_dir)
+
+        assert "### FILE: src/a/b/c/handler.py" in contents
+        assert "stale.py" not in contents
+
     def test_read_file_safe_handles_encoding(self, generator, temp_dir):
         """Should handle different file encodings."""
         utf8_file = temp_dir / "utf8.txt"
@@ -116,6 +132,15 @@ class TestCapabilityGenerator:
         content = generator._read_file_safe(utf8_file)
         assert content == "Hello 世界"
 
+    def test_read_file_safe_bounds_large_files(self, generator, temp_dir):
+        """Should only read enough of a large file to detect truncation."""
+        large_file = temp_dir / "large.txt"
+        large_file.write_text("x" * (MAX_FILE_CHARS * 3))
+
+        content = generator._read_file_safe(large_file)
+
+        assert len(content) == MAX_FILE_CHARS + 1
+
     def test_read_file_safe_handles_binary(self, generator, temp_dir):
         """Should return None for binary files."""
         binary_file = temp_dir / "binary.bin"
@@ -194,11 +219,8 @@ def health():
 """)
         (temp_dir / "README.md").write_text("# Test Service")
 
-        mock_response = MagicMock()
-        mock_response.choices = [
-            MagicMock(
-                message=MagicMock(
-                    content="""schema_version: "1.0"
+        mock_response = _llm_response(
+            """schema_version: "1.0"
 service:
   id: "temp_dir"
   name: "Test Service"
@@ -211,9 +233,7 @@ endpoints:
   api:
     health_check: "/health"
 """
-                )
-            )
-        ]
+        )
 
         with patch.object(
             type(agent_config), "get_llm_api_key", return_value="test-key"
@@ -221,11 +241,141 @@ endpoints:
             with patch("litellm.acompletion", new_callable=AsyncMock) as mock_llm:
                 mock_llm.return_value = mock_response
 
-                result = await generator.generate_capability(temp_dir)
+                result, data = await generator.generate_capability(temp_dir)
 
         assert "schema_version" in result
         assert "service" in result
         assert "runtime" in result
+        assert data["service"]["name"] == "Test Service"
+
+        content = mock_llm.call_args.kwargs["messages"][0]["content"]
+        assert content[0]["text"] == CAPABILITY_PROMPT_STATIC
+        assert content[0]["cache_control"] == {"type": "ephemeral"}
+        assert str(temp_dir) in content[1]["text"]
+
+    @pytest.mark.asyncio
+    async def test_generate_capability_uses_disk_cache(
+        self, generator, temp_dir, agent_config
+    ):
+        """Unchanged folders should be served from the completion cache."""
+        (temp_dir / "main.py").write_text("print('hello')")
+
+        with patch.object(
+            type(agent_config), "get_llm_api_key", return_value="test-key"
+        ):
+            with patch("litellm.acompletion", new_callable=AsyncMock) as mock_llm:
+                mock_llm.return_value = _llm_response(_capability_yaml("cached"))
+
+                first = await generator.generate_capability(temp_dir)
+                second = await generator.generate_capability(temp_dir)
+
+        assert mock_llm.await_count == 1
+        assert second == first
+
+    @pytest.mark.asyncio
+    async def test_generate_capability_force_bypasses_cache(
+        self, generator, temp_dir, agent_config
+    ):
+        """force=True should call the LLM again and refresh the cached entry."""
+        (temp_dir / "main.py").write_text("print('hello')")
+
+        with patch.object(
+            type(agent_config), "get_llm_api_key", return_value="test-key"
+        ):
+            with patch("litellm.acompletion", new_callable=AsyncMock) as mock_llm:
+                mock_llm.return_value = _llm_response(_capability_yaml("cached"))
+                await generator.generate_capability(temp_dir)
+
+                mock_llm.return_value = _llm_response(_capability_yaml("fresh"))
+                forced = await generator.generate_capability(temp_dir, force=True)
+                reused = await generator.generate_capability(temp_dir)
+
+        assert mock_llm.await_count == 2
+        assert "fresh" in forced[0]
+        assert reused == forced
+
+    def test_cache_put_evicts_only_over_limit(self, generator, agent_config):
+        """The cache should be scanned only when it can exceed its entry limit."""
+        agent_config.llm.cache_max_entries = 2
+        evict = generator._evict_cache
+        with patch.object(generator, "_evict_cache", wraps=evict) as mock_evict:
+            generator._cache_put("aa01", "first")
+            generator._cache_put("bb02", "second")
+            generator._cache_put("bb02", "second again")
+            assert mock_evict.call_count == 1
+
+            generator._cache_put("cc03", "third")
+            assert mock_evict.call_count == 2
+
+        remaining = [p for p in generator.cache_dir.rglob("*") if p.is_file()]
+        assert len(remaining) == 2
+
+    @pytest.mark.asyncio
+    async def test_generate_capability_reports_progress(
+        self, generator, temp_dir, agent_config
+    ):
+        """The progress callback should see each stage and the streamed reply."""
+        (temp_dir / "main.py").write_text("print('hello')")
+        events = []
+
+        with patch.object(
+            type(agent_config), "get_llm_api_key", return_value="test-key"
+        ):
+            with patch("litellm.acompletion", new_callable=AsyncMock) as mock_llm:
+                mock_llm.return_value = _llm_response(_capability_yaml("progress"))
+                result, _ = await generator.generate_capability(
+                    temp_dir, progress=lambda *event: events.append(event)
+                )
+                await generator.generate_capability(
+                    temp_dir, progress=lambda *event: events.append(event)
+                )
+
+        stages = [stage for stage, _ in events]
+        assert stages[:2] == ["prompt_ready", "requesting"]
+        assert stages[-2:] == ["prompt_ready", "cached"]
+        streamed = "".join(text for stage, text in events if stage == "chunk")
+        assert streamed.strip() == result
+        assert events[1] == ("requesting", agent_config.llm.model)
+
+    @pytest.mark.asyncio
+    async def test_generate_capability_aborts_off_schema_stream(
+        self, generator, temp_dir, agent_config
+    ):
+        """Streams without schema_version should be cut short and retried."""
+        (temp_dir / "main.py").write_text("print('hello')")
+        rambling = _llm_response("I cannot help with that. " * 1000)
+
+        with patch.object(
+            type(agent_config), "get_llm_api_key", return_value="test-key"
+        ):
+            with patch("litellm.acompletion", new_callable=AsyncMock) as mock_llm:
+                mock_llm.side_effect = [rambling, _llm_response(_capability_yaml("ok"))]
+
+                result, _ = await generator.generate_capability(temp_dir)
+
+        assert rambling.closed
+        assert mock_llm.await_count == 2
+        assert mock_llm.call_args.kwargs["stream"] is True
+        assert 'id: "ok"' in result
+
+    @pytest.mark.asyncio
+    async def test_generate_capability_closes_failed_stream(
+        self, generator, temp_dir, agent_config
+    ):
+        """A stream that errors mid-reply should still be closed."""
+        (temp_dir / "main.py").write_text("print('hello')")
+        broken = _FakeStream("schema_version: ", error=ConnectionError("reset"))
+
+        with patch.object(
+            type(agent_config), "get_llm_api_key", return_value="test-key"
+        ):
+            with patch("litellm.acompletion", new_callable=AsyncMock) as mock_llm:
+                mock_llm.return_value = broken
+
+                with pytest.raises(ConnectionError):
+                    await generator.generate_capability(temp_dir)
+
+        assert broken.closed
 
     def test_format_file_content(self, generator):
         """Should format file content with header."""
@@ -237,6 +387,146 @@ endpoints:
         assert "print('hello')" in formatted
 
 
+def _capability_yaml(service_id: str) -> str:
+    return f"""schema_version: "1.0"
+service:
+  id: "{service_id}"
+runtime:
+  start_command: "python main.py"
+  ports:
+    api:
+      default: 8000
+endpoints:
+  api:
+    health_check: "/health"
+"""
+
+
+class _FakeStream:
+    """Async iterator standing in for a litellm streaming response."""
+
+    def __init__(self, content: str, chunk_size: int = 40, error=None):
+        pieces = [
+            content[i : i + chunk_size] for i in range(0, len(content), chunk_size)
+        ]
+        self.chunks = [
+            MagicMock(choices=[MagicMock(delta=MagicMock(content=piece))], usage=None)
+            for piece in pieces
+        ]
+        self.error = error
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            if self.closed:
+                return
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _llm_response(content: str) -> _FakeStream:
+    return _FakeStream(content)
+
+
+class TestCapabilityBatch:
+    """Tests for batched capability generation."""
+
+    @pytest.fixture
+    def generator(self, agent_config, tmp_path):
+        """Create CapabilityGenerator instance."""
+        return CapabilityGenerator(agent_config, cache_dir=tmp_path / "cache")
+
+    @pytest.fixture
+    def service_paths(self, temp_dir):
+        """Create two small service folders."""
+        paths = []
+        for name in ("alpha", "beta"):
+            path = temp_dir / name
+            path.mkdir()
+            (path / "main.py").write_text(f"print('{name}')")
+            paths.append(path)
+        return paths
+
+    @pytest.mark.asyncio
+    async def test_batch_splits_documents(self, generator, agent_config, service_paths):
+        """One LLM call should yield a document per service."""
+        content = _capability_yaml("alpha") + "---\n" + _capability_yaml("beta")
+
+        with patch.object(
+            type(agent_config), "get_llm_api_key", return_value="test-key"
+        ):
+            with patch("litellm.acompletion", new_callable=AsyncMock) as mock_llm:
+                mock_llm.return_value = _llm_response(content)
+
+                results = await generator.generate_capabilities_batch(service_paths)
+
+        assert mock_llm.await_count == 1
+        assert 'id: "alpha"' in results[service_paths[0]][0]
+        assert results[service_paths[1]][1]["service"]["id"] == "beta"
+
+    @pytest.mark.asyncio
+    async def test_batch_falls_back_per_service(
+        self, generator, agent_config, service_paths
+    ):
+        """A batch answer with the wrong document count should be retried singly."""
+        responses = [
+            _llm_response(_capability_yaml("alpha")),
+            _llm_response(_capability_yaml("alpha")),
+            _llm_response(_capability_yaml("beta")),
+        ]
+
+        with patch.object(
+            type(agent_config), "get_llm_api_key", return_value="test-key"
+        ):
+            with patch("litellm.acompletion", new_callable=AsyncMock) as mock_llm:
+                mock_llm.side_effect = responses
+
+                results = await generator.generate_capabilities_batch(service_paths)
+
+        assert mock_llm.await_count == 3
+        assert 'id: "beta"' in results[service_paths[1]][0]
+
+
+    @pytest.mark.asyncio
+    async def test_batch_renders_and_reads_cache_off_loop(
+        self, generator, agent_config, service_paths
+    ):
+        """Folder walks and cache lookups should not run on the event loop."""
+        threads = []
+        render = generator._render_service_prompt
+        lookup = generator._cached_capability
+
+        def tracked(fn):
+            def wrapper(*args):
+                threads.append(threading.current_thread())
+                return fn(*args)
+
+            return wrapper
+
+        content = _capability_yaml("alpha") + "---\n" + _capability_yaml("beta")
+        with patch.object(
+            type(agent_config), "get_llm_api_key", return_value="test-key"
+        ), patch.object(
+            generator, "_render_service_prompt", tracked(render)
+        ), patch.object(
+            generator, "_cached_capability", tracked(lookup)
+        ):
+            with patch("litellm.acompletion", new_callable=AsyncMock) as mock_llm:
+                mock_llm.return_value = _llm_response(content)
+                results = await generator.generate_capabilities_batch(service_paths)
+
+        assert len(results) == 2
+        assert len(threads) == 4
+        assert threading.main_thread() not in threads
+
+
 class TestPriorityFiles:
     """Tests for priority file handling."""
 
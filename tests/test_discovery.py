@@ -1,7 +1,9 @@
 """Unit tests for ServiceDiscovery."""
 
+import asyncio
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 import yaml
@@ -171,6 +173,17 @@ class TestServiceDiscovery:
         assert len(services) == 1
         assert services[0].id == "test_service"
 
+    def test_get_all_services_reuses_snapshot(self, agent_config, service_folder):
+        """get_all_services should return the same tuple until membership changes."""
+        discovery = ServiceDiscovery(agent_config)
+        discovery.scan()
+
+        snapshot = discovery.get_all_services()
+        assert discovery.get_all_services() is snapshot
+
+        discovery.scan()
+        assert discovery.get_all_services() is not snapshot
+
     def test_refresh_service_reloads_capability(
         self, agent_config, service_folder, sample_capability_yaml
     ):
@@ -213,6 +226,26 @@ endpoints:
         assert service.capability.service_name == "New Name"
         assert service.capability.start_command == "python app.py"
 
+    def test_update_service_capability_with_parsed_data(
+        self, agent_config, service_folder
+    ):
+        """Pre-parsed capability data should be used without re-reading the file."""
+        discovery = ServiceDiscovery(agent_config)
+        discovery.scan()
+
+        cap_file = service_folder / CAPABILITY_FILENAME
+        data = yaml.safe_load(cap_file.read_text())
+        data["service"]["name"] = "Parsed Name"
+
+        with patch.object(discovery, "_load_capability") as mock_load:
+            service = discovery.update_service_capability(
+                "test_service", yaml.dump(data), data
+            )
+
+        mock_load.assert_not_called()
+        assert service.capability.service_name == "Parsed Name"
+        assert "Parsed Name" in cap_file.read_text()
+
     def test_add_service_folder(self, agent_config, temp_dir):
         """add_service_folder should add new folder and scan it."""
         discovery = ServiceDiscovery(agent_config)
@@ -231,6 +264,50 @@ endpoints:
         # New folder should be in config
         assert str(new_folder.resolve()) in agent_config.service_folders
 
+    def test_scan_folder_leaves_other_folders_untouched(
+        self, agent_config, temp_dir, service_folder
+    ):
+        """scan_folder should only rediscover services under the given folder."""
+        discovery = ServiceDiscovery(agent_config)
+        discovery.scan()
+        existing = discovery.get_service("test_service")
+
+        new_folder = temp_dir / "more"
+        (new_folder / "new_svc").mkdir(parents=True)
+        (new_folder / "new_svc" / "main.py").write_text("print('new')")
+        agent_config.service_folders.append(str(new_folder))
+        version = discovery.version
+
+        with patch.object(
+            discovery, "_list_names", wraps=discovery._list_names
+        ) as mock_list:
+            found = discovery.scan_folder(str(new_folder))
+
+        assert [s.id for s in found] == ["new_svc"]
+        assert discovery.get_service("test_service") is existing
+        assert {c.args[0] for c in mock_list.call_args_list} == {
+            new_folder,
+            str(new_folder / "new_svc"),
+        }
+        assert discovery.version > version
+
+    def test_forget_folder_drops_only_its_services(
+        self, agent_config, temp_dir, service_folder
+    ):
+        """forget_folder should remove services discovered under that folder."""
+        new_folder = temp_dir / "more"
+        (new_folder / "new_svc").mkdir(parents=True)
+        (new_folder / "new_svc" / "main.py").write_text("print('new')")
+        agent_config.service_folders.append(str(new_folder))
+        discovery = ServiceDiscovery(agent_config)
+        discovery.scan()
+
+        removed = discovery.forget_folder(str(new_folder))
+
+        assert [s.id for s in removed] == ["new_svc"]
+        assert [s.id for s in discovery.get_all_services()] == ["test_service"]
+        assert discovery.forget_folder(str(new_folder)) == []
+
     def test_add_service_folder_invalid_path(self, agent_config):
         """add_service_folder should raise ValueError for invalid paths."""
         discovery = ServiceDiscovery(agent_config)
@@ -247,6 +324,18 @@ endpoints:
         services = discovery.scan()
         assert services == []
 
+    def test_capability_rendered_yaml_is_cached(self, agent_config, service_folder):
+        """rendered_yaml should round-trip raw_yaml and dump it only once."""
+        discovery = ServiceDiscovery(agent_config)
+        discovery.scan()
+        cap = discovery.get_service("test_service").capability
+
+        with patch("agent.models.yaml.dump", wraps=yaml.dump) as mock_dump:
+            text = cap.rendered_yaml()
+            assert cap.rendered_yaml() is text
+        assert mock_dump.call_count == 1
+        assert yaml.safe_load(text) == cap.raw_yaml
+
     def test_capability_parsing(self, agent_config, service_folder):
         """Capability should be fully parsed from CAPABILITY.yaml."""
         discovery = ServiceDiscovery(agent_config)
@@ -268,3 +357,71 @@ endpoints:
         assert cap.api_base_path == "/api"
         assert cap.gpu_required is False
         assert "test" in cap.tags
+
+    def test_discover_capability_memoized(self, agent_config, service_folder):
+        """Discover capability payload should be reused until ports change."""
+        discovery = ServiceDiscovery(agent_config)
+        discovery.scan()
+        service = discovery.get_service("test_service")
+
+        first = service.get_discover_capability({"api": 8000})
+        assert service.get_discover_capability({"api": 8000}) is first
+        assert first["runtime"]["ports"]["api"]["configured"] == 8000
+
+        moved = service.get_discover_capability({"api": 8100})
+        assert moved is not first
+        assert moved["endpoints"]["api"]["port"] == 8100
+
+    def test_refresh_service_invalidates_discover_capability(
+        self, agent_config, service_folder
+    ):
+        """Reloading CAPABILITY.yaml should rebuild the discover payload."""
+        discovery = ServiceDiscovery(agent_config)
+        discovery.scan()
+        service = discovery.get_service("test_service")
+
+        first = service.get_discover_capability({"api": 8000})
+        discovery.refresh_service("test_service")
+
+        assert service.get_discover_capability({"api": 8000}) is not first
+
+    @pytest.mark.asyncio
+    async def test_subscribe_notified_on_change(self, agent_config, service_folder):
+        """Subscribers should receive one coalesced notification per burst."""
+        discovery = ServiceDiscovery(agent_config)
+        changes = discovery.subscribe()
+
+        discovery.scan()
+        discovery.mark_changed()
+        await asyncio.sleep(0)
+
+        assert changes.qsize() == 1
+        await changes.get()
+
+        discovery.unsubscribe(changes)
+        discovery.mark_changed()
+        await asyncio.sleep(0)
+        assert changes.empty()
+
+    @pytest.mark.asyncio
+    async def test_rescan_from_thread_notifies_complete_snapshot(
+        self, agent_config, service_folder
+    ):
+        """A threaded rescan should only notify once the new services are in."""
+        discovery = ServiceDiscovery(agent_config)
+        discovery.scan()
+        changes = discovery.subscribe()
+        seen = []
+        original = discovery.mark_changed
+
+        def recording_mark_changed():
+            seen.append([s.id for s in discovery.get_all_services()])
+            original()
+
+        with patch.object(discovery, "mark_changed", recording_mark_changed):
+            await asyncio.to_thread(discovery.scan)
+        await asyncio.wait_for(changes.get(), timeout=1)
+
+        assert seen == [["test_service"]]
+        assert [s.id for s in discovery.get_all_services()] == ["test_service"]
+        discovery.unsubscribe(changes)
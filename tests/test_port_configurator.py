@@ -0,0 +1,333 @@
+"""Unit tests for PortConfigurator."""
+
+import os
+import re
+import shutil
+import stat
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from agent._env import _ENV_LINE_RE, read_env_vars
+from agent.port_configurator import README_PORT_PATTERNS, PortConfigurator
+
+README = """# Demo
+
+Open http://localhost:7860 or http://127.0.0.1:7861/docs.
+
+| Port | Use |
+|------|-----|
+| 7860 | UI |
+| `7861` | API |
+
+```
+API_PORT=7861
+UI_PORT = 7860 # gradio
+python main.py --port 7860 --api-port 7861
+```
+
+Served on :7860, proxied from :7861 too.
+Meetings at 10:00 stay untouched, as does 17860.
+"""
+
+
+def _legacy_replace(content: str, old_port: int, new_port: int) -> tuple[str, int]:
+    """The per-pattern replacement the single alternation regex replaced."""
+    count = 0
+    old_port_str = str(old_port)
+    new_port_str = str(new_port)
+
+    for pattern, _ in README_PORT_PATTERNS:
+
+        def replace_if_match(match):
+            nonlocal count
+            port_in_match = None
+            for g in match.groups():
+                if g and g.isdigit() and len(g) >= 4:
+                    port_in_match = g
+                    break
+
+            if port_in_match == old_port_str:
+                count += 1
+                return re.sub(r"\d{4,5}", new_port_str, match.group(0), count=1)
+            return match.group(0)
+
+        content = re.sub(pattern, replace_if_match, content)
+
+    return content, count
+
+
+def _legacy_parse_env(content: str) -> dict[str, str]:
+    """The line-by-line .env parser that _ENV_LINE_RE replaced."""
+    env_vars = {}
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "=" in line:
+            key, _, value = line.partition("=")
+            env_vars[key.strip()] = value.strip().strip('"').strip("'")
+    return env_vars
+
+
+@pytest.fixture
+def configurator(discovery):
+    return PortConfigurator(discovery, {})
+
+
+class TestReadmePorts:
+    """Tests for README port rewriting."""
+
+    @pytest.mark.parametrize("old_port", [7860, 7861])
+    def test_single_change_matches_legacy(self, configurator, old_port):
+        """One port change should rewrite exactly what the old patterns did."""
+        content, counts = configurator._replace_ports_in_readme(
+            README, {str(old_port): "9000"}
+        )
+
+        expected, expected_count = _legacy_replace(README, old_port, 9000)
+        assert content == expected
+        assert counts == {str(old_port): expected_count}
+
+    @pytest.mark.parametrize(
+        "line, expected",
+        [
+            ("see http://0.0.0.0:7860/", "see http://0.0.0.0:9000/"),
+            ("| `7860` |", "| `9000` |"),
+            ("PORT= 7860\n", "PORT= 9000\n"),
+            ("run --ui-port 7860", "run --ui-port 9000"),
+            ("--gradio-port 7860", "--gradio-port 9000"),
+            ("(host:7860)", "(host:9000)"),
+            ("at 17:78600", "at 17:78600"),
+        ],
+    )
+    def test_each_pattern(self, configurator, line, expected):
+        """Every README pattern should still be recognised on its own."""
+        content, _ = configurator._replace_ports_in_readme(line, {"7860": "9000"})
+
+        assert content == expected
+        assert content == _legacy_replace(line, 7860, 9000)[0]
+
+    def test_simultaneous_swap(self, configurator):
+        """Swapping two ports should not chain one replacement into the other."""
+        content, counts = configurator._replace_ports_in_readme(
+            README, {"7860": "7861", "7861": "7860"}
+        )
+
+        expected = README.replace("7860", "<a>").replace("7861", "7860")
+        expected = expected.replace("<a>", "7861").replace("17861", "17860")
+        assert content == expected
+        assert counts == {"7860": 5, "7861": 5}
+
+    def test_update_readme_ports_writes_file(self, configurator, temp_dir):
+        """update_readme_ports should rewrite README.md and report the count."""
+        (temp_dir / "README.md").write_text(README)
+
+        result = configurator.update_readme_ports(
+            temp_dir, [{"old_port": 7860, "new_port": 9000}]
+        )
+
+        assert result["updated"] is True
+        assert result["changes_made"] == 5
+        assert (temp_dir / "README.md").read_text() == _legacy_replace(
+            README, 7860, 9000
+        )[0]
+
+
+class TestCaches:
+    """Tests for the stat-keyed file caches and the per-pass probe cache."""
+
+    def test_env_cache_hit_and_refresh_after_write(self, configurator, temp_dir):
+        """.env parses should be reused until write_env_file changes the file."""
+        env_path = temp_dir / ".env"
+        env_path.write_text("API_PORT=8000\n")
+
+        first = configurator.read_env_file(env_path)
+        assert configurator.read_env_file(env_path) is first
+
+        configurator.write_env_file(env_path, {"API_PORT": 8100})
+
+        refreshed = configurator.read_env_file(env_path)
+        assert refreshed is not first
+        assert refreshed == {"API_PORT": "8100"}
+
+    def test_env_cache_invalidated_by_external_rewrite(self, configurator, temp_dir):
+        """An edit made outside the configurator should change the stat key."""
+        env_path = temp_dir / ".env"
+        env_path.write_text("API_PORT=8000\n")
+        configurator.read_env_file(env_path)
+
+        env_path.write_text("API_PORT=81000\n")
+
+        assert configurator.read_env_file(env_path) == {"API_PORT": "81000"}
+
+    def test_readme_cache_hit_and_refresh_after_update(self, configurator, temp_dir):
+        """README text should be cached and replaced by update_readme_ports."""
+        readme_path = temp_dir / "README.md"
+        readme_path.write_text("Open http://localhost:8000\n")
+
+        first = configurator._read_readme(readme_path)
+        assert configurator._read_readme(readme_path) is first
+
+        configurator.update_readme_ports(
+            temp_dir, [{"old_port": 8000, "new_port": 8100}]
+        )
+
+        assert configurator._read_readme(readme_path) == "Open http://localhost:8100\n"
+        readme_path.write_text("Open http://localhost:81000\n")
+        assert configurator._read_readme(readme_path) == "Open http://localhost:81000\n"
+
+    def test_conflicts_cached_until_env_changes(
+        self, configurator, discovery, service_folder
+    ):
+        """Conflict maps should be reused until a service's .env is rewritten."""
+        shutil.copytree(service_folder, service_folder.parent / "other_service")
+        discovery.scan()
+        (service_folder / ".env").write_text("API_PORT=8100\n")
+
+        first = configurator.get_configured_port_conflicts()
+        with patch("agent.port_configurator.read_env_vars") as mock_read:
+            assert configurator.get_configured_port_conflicts() is first
+        mock_read.assert_not_called()
+        assert first == {}
+
+        (service_folder / ".env").write_text("API_PORT=8000\n")
+
+        conflicts = configurator.get_configured_port_conflicts()
+        assert sorted(conflicts[8000]) == ["other_service:api", "test_service:api"]
+
+    def test_probe_cache_reused_within_pass(self, configurator):
+        """Ports probed once in a pass should not be bind()-probed again."""
+        probe_cache: dict[int, bool] = {}
+        in_use = {8100: True, 8101: True}
+
+        with patch(
+            "agent.port_configurator.is_port_in_use",
+            side_effect=lambda port: in_use.get(port, False),
+        ) as probe:
+            first = configurator.get_next_available_port("api", {8102}, probe_cache)
+            second = configurator.get_next_available_port(
+                "api", {8102, first}, probe_cache
+            )
+
+        assert (first, second) == (8103, 8104)
+        assert [c.args[0] for c in probe.call_args_list] == [8100, 8101, 8103, 8104]
+
+
+class TestWriteEnvFile:
+    """Tests for the atomic .env rewrite."""
+
+    def test_updates_and_appends_keys(self, configurator, temp_dir):
+        """Existing keys should be rewritten in place and new ones appended."""
+        env_path = temp_dir / ".env"
+        env_path.write_text("# ports\nAPI_PORT=8000\nSECRET=x\n")
+
+        configurator.write_env_file(env_path, {"API_PORT": 8100, "UI_PORT": 7800})
+
+        assert env_path.read_text() == (
+            "# ports\nAPI_PORT=8100\nSECRET=x\n"
+            "\n# Port configured by ServiceAgent\nUI_PORT=7800\n"
+        )
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX file modes")
+    def test_preserves_mode_of_existing_file(self, configurator, temp_dir):
+        """A rewritten .env should keep the original permission bits."""
+        env_path = temp_dir / ".env"
+        env_path.write_text("API_PORT=8000\n")
+        env_path.chmod(0o640)
+
+        configurator.write_env_file(env_path, {"API_PORT": 8100})
+
+        assert stat.S_IMODE(env_path.stat().st_mode) == 0o640
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX file modes")
+    def test_new_file_is_private(self, configurator, temp_dir):
+        """A newly created .env should not be readable by other users."""
+        env_path = temp_dir / ".env"
+
+        configurator.write_env_file(env_path, {"API_PORT": 8100})
+
+        assert stat.S_IMODE(env_path.stat().st_mode) == 0o600
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="symlinks need privileges")
+    def test_keeps_symlinked_env(self, configurator, temp_dir):
+        """A symlinked .env should stay a link and its target should be updated."""
+        shared = temp_dir / "shared"
+        shared.mkdir()
+        target = shared / "service.env"
+        target.write_text("API_PORT=8000\n")
+        env_path = temp_dir / ".env"
+        env_path.symlink_to(target)
+
+        configurator.write_env_file(env_path, {"API_PORT": 8100})
+
+        assert env_path.is_symlink()
+        assert target.read_text() == "API_PORT=8100\n"
+
+    def test_syncs_before_rename(self, configurator, temp_dir):
+        """Content should be fsynced to the temp file before it replaces .env."""
+        env_path = temp_dir / ".env"
+        env_path.write_text("API_PORT=8000\n")
+        calls = []
+        real_fsync, real_replace = os.fsync, os.replace
+
+        def fsync(fd):
+            calls.append("fsync")
+            real_fsync(fd)
+
+        def replace(src, dst):
+            calls.append("replace")
+            assert Path(src).read_text() == "API_PORT=8100\n"
+            real_replace(src, dst)
+
+        with patch("os.fsync", fsync), patch("os.replace", replace):
+            configurator.write_env_file(env_path, {"API_PORT": 8100})
+
+        assert calls == ["fsync", "replace"]
+
+    def test_failed_rename_leaves_original(self, configurator, temp_dir):
+        """A failed rename should keep the old .env and remove the temp file."""
+        env_path = temp_dir / ".env"
+        env_path.write_text("API_PORT=8000\n")
+
+        with patch("os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                configurator.write_env_file(env_path, {"API_PORT": 8100})
+
+        assert env_path.read_text() == "API_PORT=8000\n"
+        assert [p.name for p in temp_dir.glob(".env*")] == [".env"]
+
+
+class TestParseEnvFile:
+    """Tests for .env parsing, which must match the original line parser."""
+
+    @pytest.mark.parametrize(
+        "content, expected",
+        [
+            ("# ports\n\n  # API_PORT=1\nAPI_PORT=8000\n", {"API_PORT": "8000"}),
+            ("\n\n   \n", {}),
+            ("export API_PORT=8100\n", {"export API_PORT": "8100"}),
+            ("API_PORT=\n", {"API_PORT": ""}),
+            ("=value\n", {"": "value"}),
+            ("a=b=c\n", {"a": "b=c"}),
+            ("A=1\r\nB = 2 \r\n", {"A": "1", "B": "2"}),
+            ("A='x y'\nB=\"z\"\nC=\"it's\"\n", {"A": "x y", "B": "z", "C": "it's"}),
+            ("API_PORT=8000 # default\n", {"API_PORT": "8000 # default"}),
+            ("NO_EQUALS\nA=1", {"A": "1"}),
+        ],
+    )
+    def test_parse_matches_legacy(self, temp_dir, content, expected):
+        """Each edge case should parse exactly as the line parser did."""
+        env_path = temp_dir / ".env"
+        env_path.write_bytes(content.encode("utf-8"))
+
+        assert read_env_vars(env_path) == expected
+        assert expected == _legacy_parse_env(content)
+
+    def test_line_regex_is_anchored_per_line(self):
+        """A value must never run on into the next line."""
+        matches = _ENV_LINE_RE.findall("A =1\n# B=2\nC=\n")
+
+        assert matches == [("A ", "1"), ("C", "")]
@@ -0,0 +1,44 @@
+"""Unit tests for ResourceMonitor."""
+
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from agent.resource_monitor import ResourceMonitor
+
+
+@pytest.fixture
+def monitor(agent_config):
+    return ResourceMonitor(agent_config)
+
+
+class TestLatestStats:
+    """Tests for the snapshot served to the API."""
+
+    def test_first_call_refreshes_inline(self, monitor):
+        """Without a snapshot the stats should be gathered immediately."""
+        with patch.object(monitor, "get_all_stats", return_value={"cpu": 1}):
+            assert monitor.latest_stats() == {"cpu": 1}
+
+    @pytest.mark.asyncio
+    async def test_stale_snapshot_refreshes_off_loop(self, monitor):
+        """On the loop a stale snapshot should be served while a worker refreshes."""
+        threads = []
+
+        def probe():
+            threads.append(threading.current_thread())
+            return {"cpu": len(threads)}
+
+        with patch.object(monitor, "get_all_stats", side_effect=probe):
+            monitor.refresh_stats()
+            with patch("agent.resource_monitor.STATS_SNAPSHOT_MAX_AGE_SECONDS", 0):
+                assert monitor.latest_stats() == {"cpu": 1}
+                assert monitor.latest_stats() == {"cpu": 1}
+                await asyncio.wait_for(monitor._refresh_task, timeout=1)
+
+        assert len(threads) == 2
+        assert threads[1] is not threading.main_thread()
+        assert monitor._refresh_task is None
+        assert monitor._snapshot[1] == {"cpu": 2}
@@ -1,14 +1,44 @@
 """Unit tests for ServiceManager."""
 
 import asyncio
-import subprocess
+import shutil
+import socket
+import sys
 from datetime import datetime
+from pathlib import Path
 from unittest.mock import MagicMock, AsyncMock, patch, PropertyMock
 
+import httpx
 import pytest
 
-from agent.service_manager import ServiceManager
-from agent.models import Service, ServiceStatus, ServiceCapability, PortConfig
+from agent.port_configurator import PortConfigurator
+from agent.service_manager import (
+    ServiceManager,
+    snapshot_listening_ports,
+    split_start_command,
+)
+from agent.models import (
+    MAX_LOG_LINES,
+    Service,
+    ServiceStatus,
+    ServiceCapability,
+    PortConfig,
+)
+
+
+def _mock_process(returncode=None):
+    """Create a mock asyncio subprocess with the given exit state."""
+    process = MagicMock()
+    process.pid = 12345
+    process.returncode = returncode
+    process.stdout = None
+    process.wait = AsyncMock(return_value=returncode or 0)
+    return process
+
+
+async def _until(predicate):
+    while not predicate():
+        await asyncio.sleep(0.01)
 
 
 class TestServiceManagerStart:
@@ -71,12 +101,10 @@ class TestServiceManagerStart:
         """Start should launch process and update service state."""
         discovery.scan()
 
-        with patch("subprocess.Popen") as mock_popen:
-            mock_process = MagicMock()
-            mock_process.pid = 12345
-            mock_process.poll.return_value = None
-            mock_process.stdout = iter([])
-            mock_popen.return_value = mock_process
+        with patch(
+            "asyncio.create_subprocess_exec", new_callable=AsyncMock
+        ) as mock_exec:
+            mock_exec.return_value = _mock_process()
 
             # Patch health check wait
             with patch.object(
@@ -89,6 +117,60 @@ class TestServiceManagerStart:
         assert service.assigned_ports == {"api": 8000}
         assert service.start_time is not None
 
+    @pytest.mark.asyncio
+    async def test_concurrent_starts_launch_one_process(
+        self, service_manager, discovery, service_folder
+    ):
+        """Two overlapping starts should not both spawn the service."""
+        discovery.scan()
+
+        async def slow_ready(service):
+            await asyncio.sleep(0.05)
+
+        with patch(
+            "asyncio.create_subprocess_exec", new_callable=AsyncMock
+        ) as mock_exec:
+            mock_exec.return_value = _mock_process()
+
+            with patch.object(service_manager, "_wait_for_ready", slow_ready):
+                results = await asyncio.gather(
+                    service_manager.start_service("test_service"),
+                    service_manager.start_service("test_service"),
+                    return_exceptions=True,
+                )
+
+        assert mock_exec.await_count == 1
+        assert isinstance(results[1], ValueError)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_auto_port_starts_get_distinct_ports(
+        self, service_manager, discovery, service_folder, agent_config
+    ):
+        """Overlapping auto-port starts should not hand out the same free port."""
+        shutil.copytree(service_folder, service_folder.parent / "other_service")
+        discovery.scan()
+        ranges = agent_config.port_ranges
+        ranges.api_port_min, ranges.api_port_max = 8000, 8010
+
+        async def slow_ready(service):
+            await asyncio.sleep(0.05)
+
+        with patch(
+            "asyncio.create_subprocess_exec", new_callable=AsyncMock
+        ) as mock_exec, patch(
+            "agent.service_manager.snapshot_listening_ports", return_value=set()
+        ), patch("agent.service_manager.is_port_in_use", return_value=False):
+            mock_exec.side_effect = lambda *a, **kw: _mock_process()
+
+            with patch.object(service_manager, "_wait_for_ready", slow_ready):
+                started = await asyncio.gather(
+                    service_manager.start_service_auto_ports("test_service"),
+                    service_manager.start_service_auto_ports("other_service"),
+                )
+
+        assert {s.assigned_ports["api"] for s in started} == {8000, 8001}
+        assert service_manager._reserved_ports == {}
+
     @pytest.mark.asyncio
     async def test_start_service_custom_ports(
         self, service_manager, discovery, service_folder
@@ -96,12 +178,10 @@ class TestServiceManagerStart:
         """Start should accept custom port assignments."""
         discovery.scan()
 
-        with patch("subprocess.Popen") as mock_popen:
-            mock_process = MagicMock()
-            mock_process.pid = 12345
-            mock_process.poll.return_value = None
-            mock_process.stdout = iter([])
-            mock_popen.return_value = mock_process
+        with patch(
+            "asyncio.create_subprocess_exec", new_callable=AsyncMock
+        ) as mock_exec:
+            mock_exec.return_value = _mock_process()
 
             with patch.object(
                 service_manager, "_wait_for_ready", new_callable=AsyncMock
@@ -121,15 +201,11 @@ class TestServiceManagerStart:
 
         captured_env = {}
 
-        def capture_popen(*args, **kwargs):
+        async def capture_exec(*args, **kwargs):
             captured_env.update(kwargs.get("env", {}))
-            mock_process = MagicMock()
-            mock_process.pid = 12345
-            mock_process.poll.return_value = None
-            mock_process.stdout = iter([])
-            return mock_process
+            return _mock_process()
 
-        with patch("subprocess.Popen", side_effect=capture_popen):
+        with patch("asyncio.create_subprocess_exec", side_effect=capture_exec):
             with patch.object(
                 service_manager, "_wait_for_ready", new_callable=AsyncMock
             ):
@@ -137,6 +213,41 @@ class TestServiceManagerStart:
 
         assert captured_env.get("API_PORT") == "8000"
 
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX exec path")
+    async def test_start_service_execs_without_shell(
+        self, service_manager, discovery, service_folder
+    ):
+        """Simple start commands should be exec'd as argv without a shell."""
+        discovery.scan()
+
+        with patch(
+            "asyncio.create_subprocess_exec", new_callable=AsyncMock
+        ) as mock_exec:
+            mock_exec.return_value = _mock_process()
+
+            with patch.object(
+                service_manager, "_wait_for_ready", new_callable=AsyncMock
+            ):
+                await service_manager.start_service("test_service")
+
+        args, kwargs = mock_exec.call_args
+        assert args == ("python", "main.py")
+        assert "shell" not in kwargs
+        assert set(kwargs) == {"cwd", "env", "stdout", "stderr"}
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX exec path")
+    def test_split_start_command_keeps_shell_syntax(self):
+        """Commands using shell features should not be tokenized."""
+        assert split_start_command("python main.py --port 8000") == (
+            "python",
+            "main.py",
+            "--port",
+            "8000",
+        )
+        assert split_start_command("cd src && python main.py") is None
+        assert split_start_command("PORT=1 python main.py") is None
+
     @pytest.mark.asyncio
     async def test_start_service_process_exit(
         self, service_manager, discovery, service_folder
@@ -147,13 +258,12 @@ class TestServiceManagerStart:
         service = discovery.get_service("test_service")
         service.capability.health_check_path = None
 
-        with patch("subprocess.Popen") as mock_popen:
-            mock_process = MagicMock()
-            mock_process.pid = 12345
-            mock_process.poll.return_value = 1  # Process exited
-            mock_process.returncode = 1
-            mock_process.stdout = iter([])
-            mock_popen.return_value = mock_process
+        with patch(
+            "asyncio.create_subprocess_exec", new_callable=AsyncMock
+        ) as mock_exec, patch(
+            "agent.service_manager.asyncio.sleep", new_callable=AsyncMock
+        ):
+            mock_exec.return_value = _mock_process(returncode=1)  # Process exited
 
             with pytest.raises(RuntimeError, match="Process exited"):
                 await service_manager.start_service("test_service")
@@ -188,9 +298,7 @@ class TestServiceManagerStop:
         discovery.scan()
         service = discovery.get_service("test_service")
 
-        mock_process = MagicMock()
-        mock_process.pid = 12345
-        mock_process.wait.return_value = 0
+        mock_process = _mock_process()
         service.process = mock_process
         service.status = ServiceStatus.RUNNING
         service.pid = 12345
@@ -210,12 +318,8 @@ class TestServiceManagerStop:
         discovery.scan()
         service = discovery.get_service("test_service")
 
-        mock_process = MagicMock()
-        mock_process.pid = 12345
-        mock_process.wait.side_effect = [
-            subprocess.TimeoutExpired("cmd", 10),
-            None,
-        ]
+        mock_process = _mock_process()
+        mock_process.wait.side_effect = [asyncio.TimeoutError(), 0]
         service.process = mock_process
         service.status = ServiceStatus.RUNNING
 
@@ -238,17 +342,16 @@ class TestServiceManagerRestart:
         service.status = ServiceStatus.RUNNING
         service.assigned_ports = {"api": 9000}
 
-        mock_process = MagicMock()
-        mock_process.wait.return_value = 0
-        service.process = mock_process
+        service.process = _mock_process()
 
+        # Restart holds the service lock, so it calls the unlocked bodies.
         with patch.object(
-            service_manager, "stop_service", new_callable=AsyncMock
+            service_manager, "_stop_service", new_callable=AsyncMock
         ) as mock_stop:
             mock_stop.return_value = service
 
             with patch.object(
-                service_manager, "start_service", new_callable=AsyncMock
+                service_manager, "_start_service", new_callable=AsyncMock
             ) as mock_start:
                 mock_start.return_value = service
                 await service_manager.restart_service("test_service")
@@ -285,10 +388,7 @@ class TestServiceManagerHealth:
         service = discovery.get_service("test_service")
         service.status = ServiceStatus.RUNNING
 
-        mock_process = MagicMock()
-        mock_process.poll.return_value = 1
-        mock_process.returncode = 1
-        service.process = mock_process
+        service.process = _mock_process(returncode=1)
 
         result = await service_manager.check_service_health("test_service")
         assert result["status"] == "crashed"
@@ -304,9 +404,7 @@ class TestServiceManagerHealth:
         service.status = ServiceStatus.RUNNING
         service.capability.health_check_path = None
 
-        mock_process = MagicMock()
-        mock_process.poll.return_value = None
-        service.process = mock_process
+        service.process = _mock_process()
 
         result = await service_manager.check_service_health("test_service")
         assert result["status"] == "unknown"
@@ -321,17 +419,250 @@ class TestServiceManagerHealth:
         service.status = ServiceStatus.RUNNING
         service.assigned_ports = {"api": 8000}
 
-        mock_process = MagicMock()
-        mock_process.poll.return_value = None
-        service.process = mock_process
+        service.process = _mock_process()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
-            mock_client_class.return_value.__aenter__.return_value = mock_httpx_client
+        service_manager._http_client = mock_httpx_client
 
-            result = await service_manager.check_service_health("test_service")
+        result = await service_manager.check_service_health("test_service")
 
         assert result["status"] == "healthy"
 
+    @pytest.mark.asyncio
+    async def test_wait_for_ready_uses_shared_client(
+        self, service_manager, discovery, service_folder, mock_httpx_client
+    ):
+        """_wait_for_ready should probe through the manager's pooled client."""
+        discovery.scan()
+        service = discovery.get_service("test_service")
+        service.assigned_ports = {"api": 8000}
+        service.capability.health_check_path = "/health"
+
+        service.process = _mock_process()
+
+        service_manager._http_client = mock_httpx_client
+
+        await service_manager._wait_for_ready(service, timeout=5)
+
+        mock_httpx_client.get.assert_awaited_once()
+        assert mock_httpx_client.get.await_args.args[0] == (
+            "http://localhost:8000/health"
+        )
+
+    @pytest.mark.asyncio
+    async def test_wait_for_ready_backs_off(
+        self, service_manager, discovery, service_folder, mock_httpx_client
+    ):
+        """_wait_for_ready should probe eagerly and double the delay on refusals."""
+        discovery.scan()
+        service = discovery.get_service("test_service")
+        service.assigned_ports = {"api": 8000}
+        service.capability.health_check_path = "/health"
+        service.process = None
+
+        mock_httpx_client.get.side_effect = [
+            httpx.ConnectError("refused"),
+            httpx.ConnectError("refused"),
+            MagicMock(status_code=503),
+            MagicMock(status_code=200),
+        ]
+        service_manager._http_client = mock_httpx_client
+
+        with patch("agent.service_manager.random.uniform", return_value=0), patch(
+            "agent.service_manager.asyncio.sleep", new_callable=AsyncMock
+        ) as mock_sleep:
+            await service_manager._wait_for_ready(service, timeout=5)
+
+        delays = [call.args[0] for call in mock_sleep.await_args_list]
+        assert delays == [0.1, 0.2, 0.4]
+
+
+class TestServiceManagerProcessExit:
+    """Tests for asyncio process lifecycle handling."""
+
+    @pytest.mark.asyncio
+    async def test_wait_for_ready_wakes_on_exit(
+        self, service_manager, discovery, service_folder, mock_httpx_client
+    ):
+        """_wait_for_ready should fail fast once the process exits."""
+        discovery.scan()
+        service = discovery.get_service("test_service")
+        service.assigned_ports = {"api": 8000}
+        service.capability.health_check_path = "/health"
+        service.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", "pass"
+        )
+
+        mock_httpx_client.get.side_effect = httpx.ConnectError("refused")
+        service_manager._http_client = mock_httpx_client
+
+        with pytest.raises(RuntimeError, match="Process exited"):
+            await asyncio.wait_for(
+                service_manager._wait_for_ready(service, timeout=30), timeout=10
+            )
+        await service.process.wait()
+        await asyncio.sleep(0)
+
+    @pytest.mark.asyncio
+    async def test_start_service_captures_logs(
+        self, service_manager, discovery, service_folder
+    ):
+        """Output of a real child process should be drained into service.logs."""
+        discovery.scan()
+        service = discovery.get_service("test_service")
+        service.capability.health_check_path = None
+        (service.path / "ready.py").write_text(
+            "import time\nprint('ready', flush=True)\ntime.sleep(30)\n"
+        )
+        service.capability.start_command = f"{sys.executable} ready.py"
+
+        await service_manager.start_service("test_service")
+        try:
+            await asyncio.wait_for(_until(lambda: service.logs), timeout=10)
+            assert list(service.logs) == ["ready"]
+        finally:
+            await service_manager.stop_service("test_service")
+
+        assert service.status == ServiceStatus.STOPPED
+        assert "test_service" not in service_manager._log_tasks
+
+    @pytest.mark.asyncio
+    async def test_start_without_health_check_detects_crash(
+        self, service_manager, discovery, service_folder
+    ):
+        """A service that dies at once should fail to start without a fixed wait."""
+        discovery.scan()
+        service = discovery.get_service("test_service")
+        service.capability.health_check_path = None
+        (service.path / "crash.py").write_text("raise SystemExit(3)\n")
+        service.capability.start_command = f"{sys.executable} crash.py"
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with patch("agent.service_manager.STARTUP_LIVENESS_SECONDS", 5):
+            with pytest.raises(RuntimeError, match="code 3"):
+                await service_manager.start_service("test_service")
+
+        assert loop.time() - started < 5
+        assert service.status == ServiceStatus.FAILED
+
+
+class TestListeningPortSnapshot:
+    """Tests for the batched listening-port snapshot."""
+
+    def test_snapshot_includes_listening_socket(self):
+        """snapshot_listening_ports should report a port we are listening on."""
+        with socket.socket() as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen()
+            port = listener.getsockname()[1]
+
+            assert port in snapshot_listening_ports()
+
+    def test_assign_skips_listening_ports(
+        self, service_manager, discovery, service_folder
+    ):
+        """assign_non_conflicting_ports should not bind-probe known listeners."""
+        discovery.scan()
+
+        with patch(
+            "agent.service_manager.snapshot_listening_ports", return_value={8000}
+        ), patch(
+            "agent.service_manager.is_port_in_use", return_value=False
+        ) as mock_probe:
+            assignments = service_manager.assign_non_conflicting_ports()
+
+        assert assignments["test_service"]["api"] != 8000
+        assert 8000 not in [call.args[0] for call in mock_probe.call_args_list]
+
+    def test_assign_probes_shared_busy_default_once(
+        self, service_manager, discovery, service_folder
+    ):
+        """A busy default port shared by several services is bind-probed once."""
+        shutil.copytree(service_folder, service_folder.parent / "test_service_b")
+        discovery.scan()
+
+        with patch(
+            "agent.service_manager.snapshot_listening_ports", return_value=set()
+        ), patch(
+            "agent.service_manager.is_port_in_use",
+            side_effect=lambda port: port == 8000,
+        ) as mock_probe:
+            assignments = service_manager.assign_non_conflicting_ports()
+
+        probed = [call.args[0] for call in mock_probe.call_args_list]
+        assert probed.count(8000) == 1
+        assert len({ports["api"] for ports in assignments.values()}) == 2
+
+
+class TestPortAllocation:
+    """Tests for get_next_available_port."""
+
+    def test_resumes_after_last_port_and_wraps(self, service_manager, agent_config):
+        """Unhinted searches should continue past the last port, then wrap."""
+        ranges = agent_config.port_ranges
+        ranges.api_port_min, ranges.api_port_max = 8100, 8103
+
+        with patch(
+            "agent.service_manager.is_port_in_use", return_value=False
+        ) as mock_probe:
+            first = service_manager.get_next_available_port("api")
+            second = service_manager.get_next_available_port("api")
+            mock_probe.reset_mock()
+            wrapped = service_manager.get_next_available_port("api", {8102, 8103})
+
+        assert (first, second, wrapped) == (8100, 8101, 8100)
+        assert [c.args[0] for c in mock_probe.call_args_list] == [8100]
+
+    def test_explicit_start_leaves_hint(self, service_manager, agent_config):
+        """Pass-local scans with ``start`` should not move the shared hint."""
+        ranges = agent_config.port_ranges
+        ranges.api_port_min, ranges.api_port_max = 8100, 8103
+
+        with patch("agent.service_manager.is_port_in_use", return_value=False):
+            assert service_manager.get_next_available_port("api", start=8102) == 8102
+            assert service_manager.get_next_available_port("api") == 8100
+
+
+class TestConfiguredPorts:
+    """Tests for .env-driven port configuration."""
+
+    def test_configured_ports_follow_env_changes(
+        self, service_manager, discovery, service_folder
+    ):
+        """_get_configured_ports should reuse parsed .env until it changes."""
+        discovery.scan()
+        service = discovery.get_service("test_service")
+        env_path = service.path / ".env"
+        env_path.write_text('API_PORT="8123"\n')
+
+        assert service_manager._get_configured_ports(service) == {"api": 8123}
+        with patch.object(Path, "read_bytes") as mock_read:
+            assert service_manager._get_configured_ports(service) == {"api": 8123}
+        mock_read.assert_not_called()
+
+        env_path.write_text("API_PORT=8124  \n")
+        assert service_manager._get_configured_ports(service) == {"api": 8124}
+
+    def test_configured_ports_match_port_configurator(
+        self, service_manager, discovery, service_folder
+    ):
+        """Both components should read the same parsed .env after a rewrite."""
+        discovery.scan()
+        service = discovery.get_service("test_service")
+        env_path = service.path / ".env"
+        env_path.write_text("API_PORT=8123\n")
+        configurator = PortConfigurator(discovery, {})
+
+        assert service_manager._get_configured_ports(service) == {"api": 8123}
+        configurator.write_env_file(env_path, {"API_PORT": 8200})
+
+        with patch.object(Path, "read_bytes", wraps=env_path.read_bytes) as mock_read:
+            assert service_manager._get_configured_ports(service) == {"api": 8200}
+            assert configurator.get_current_port_config("test_service")["api"][
+                "configured"
+            ] == 8200
+        assert mock_read.call_count == 1
+
 
 class TestServiceManagerLogs:
     """Tests for log retrieval."""
@@ -345,12 +676,22 @@ class TestServiceManagerLogs:
         """get_service_logs should return last N lines."""
         discovery.scan()
         service = discovery.get_service("test_service")
-        service.logs = [f"line {i}" for i in range(200)]
+        service.logs.extend(f"line {i}" for i in range(200))
 
         logs = service_manager.get_service_logs("test_service", lines=50)
         assert len(logs) == 50
         assert logs[-1] == "line 199"
 
+    def test_logs_are_bounded(self, service_manager, discovery, service_folder):
+        """Only the newest MAX_LOG_LINES lines should be kept."""
+        discovery.scan()
+        service = discovery.get_service("test_service")
+        service.logs.extend(f"line {i}" for i in range(MAX_LOG_LINES + 500))
+
+        logs = service_manager.get_service_logs("test_service", lines=MAX_LOG_LINES * 2)
+        assert len(logs) == MAX_LOG_LINES
+        assert logs[0] == "line 500"
+
 
 class TestStopAllServices:
     """Tests for stopping all services."""
@@ -362,10 +703,38 @@ class TestStopAllServices:
         service = discovery.get_service("test_service")
         service.status = ServiceStatus.RUNNING
 
-        mock_process = MagicMock()
-        mock_process.wait.return_value = 0
-        service.process = mock_process
+        service.process = _mock_process()
 
         await service_manager.stop_all_services()
 
         assert service.status == ServiceStatus.STOPPED
+
+    @pytest.mark.asyncio
+    async def test_stuck_services_share_one_grace_period(
+        self, service_manager, discovery, service_folder
+    ):
+        """Stuck services should be force-killed in parallel, not one by one."""
+        for name in ("test_service_b", "test_service_c"):
+            shutil.copytree(service_folder, service_folder.parent / name)
+        services = discovery.scan()
+        for service in services:
+            killed = asyncio.Event()
+
+            async def wait(killed=killed):
+                await killed.wait()
+                return -9
+
+            service.status = ServiceStatus.RUNNING
+            service.process = _mock_process()
+            service.process.wait = wait
+            service.process.kill.side_effect = killed.set
+
+        loop = asyncio.get_running_loop()
+        with patch("agent.service_manager.STOP_GRACE_SECONDS", 0.2):
+            started = loop.time()
+            await service_manager.stop_all_services()
+            elapsed = loop.time() - started
+
+        assert elapsed < 0.4
+        assert all(s.status == ServiceStatus.STOPPED for s in services)
+        assert all(s.process is None for s in services)